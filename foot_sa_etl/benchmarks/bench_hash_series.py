@@ -0,0 +1,64 @@
+"""
+Benchmark of the hashing of the bronze "html" column and of the silver "id" column:
+per-row map_elements(generate_hash) against the batched hash_series, on one thread and on all CPUs.
+SHA-256 itself bounds a single thread, the HTML column only gets faster with several CPUs.
+
+Run from the foot_sa_etl folder:
+    python benchmarks/bench_hash_series.py --rows 20000
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+import polars as pl
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../foot_sa_etl')))
+
+from utils.common_helpers import generate_hash, hash_series
+
+
+def random_strings(nb_rows: int, length: int) -> pl.Series:
+    """
+    Generates a Series of random strings of the given length.
+    """
+    alphabet = string.ascii_letters + string.digits + ' <>/="'
+    return pl.Series("value", [''.join(random.choices(alphabet, k=length)) for _ in range(nb_rows)])
+
+
+def rows_per_second(function, series: pl.Series, repeat: int = 3) -> float:
+    """
+    Returns the best throughput of the function over `repeat` runs.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(series)
+        best = min(best, time.perf_counter() - start)
+    return len(series) / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = {
+        # A trimmed BBC page weighs a few dozen KiB, an id is team + date + title
+        "html (30 KiB)": random_strings(args.rows // 10, 30 * 1024),
+        "id (80 chars)": random_strings(args.rows, 80),
+    }
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'column':<16}{'map_elements rows/s':>22}{'1 thread rows/s':>18}{'all CPUs rows/s':>18}{'speedup':>10}")
+    for name, series in cases.items():
+        before = rows_per_second(lambda s: s.map_elements(generate_hash, return_dtype=pl.String), series)
+        serial = rows_per_second(lambda s: hash_series(s, n_threads=1), series)
+        after = rows_per_second(hash_series, series)
+        print(f"{name:<16}{before:>22,.0f}{serial:>18,.0f}{after:>18,.0f}{after / before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
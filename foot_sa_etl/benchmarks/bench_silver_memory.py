@@ -0,0 +1,250 @@
+"""
+Benchmark of the peak memory of the silver transform on a first run (empty extraction cache):
+the eager pipeline that silver ran before the batches (download every bronze file in memory,
+deduplicate, resolve the HTML objects, extract, explode, hash, deduplicate, filter) against the
+batched one of process_raw_epl_news, which takes the bronze files BATCH_FILES days at a time from
+the scan to the written output.
+
+With the content-addressed bronze layout the html column is null, the pages are read from a local
+copy of the objects folder (<objects_folder_name>/<folder_name> of the bronze container), laid out
+as in the container. Every mode runs in its own process so that its peak resident set size is
+measured alone.
+
+Run from the foot_sa_etl folder on a local copy of the bronze folder (a year of daily files):
+    python benchmarks/bench_silver_memory.py --bronze-dir /data/bronze/epl_news --objects-dir /data/bronze/_objects/epl_news
+or on a synthetic dataset of BBC-like pages written to a folder:
+    python benchmarks/bench_silver_memory.py --generate /tmp/silver_bench --days 365 --modes batched
+
+Results on synthetic datasets (20 teams, 3 pages of ~140 KiB and 10 articles each per day, content-addressed
+layout, batches of 14 days, 1 CPU, 5 GiB of memory, lxml engine, one parsing process, polars 2.0.0):
+    days   mode       files        rows     seconds    peak RSS MiB
+    60     eager         60       36000         9.5           1,628
+    60     batched       60       36000         8.6             571
+    120    eager        120       72000        23.9           3,106
+    120    batched      120       72000        17.5             577
+    365    batched      365      219000        62.6             583
+The eager peak grows with the HTML of every page of the backlog, a year of it does not fit in memory here.
+The batched peak is set by the pages of one batch and stays flat with the length of the backlog.
+"""
+import io
+import os
+import sys
+import glob
+import gzip
+import time
+import random
+import resource
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+
+import polars as pl
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../foot_sa_etl')))
+
+ENGINE = "lxml"
+
+# Number of daily bronze files per batch, as the 'silver_batch_files' entry of the config
+BATCH_FILES = 14
+
+
+def resolve_local_objects(df: pl.DataFrame, objects_dir: str) -> pl.DataFrame:
+    """
+    Local counterpart of resolve_html_references: fills the null 'html' values of the deduplicated
+    pages from the objects folder copied on disk.
+    """
+    from assets.silver_assets.process_raw_epl_news import deduplicate_pages
+    from utils.azure_blob_utils import get_object_path
+
+    df = deduplicate_pages(df)
+
+    missing_hashes = df.filter(pl.col("html").is_null()).get_column("_hashedId").to_list()
+    if not missing_hashes or objects_dir is None:
+        return df
+
+    htmls = []
+    for content_hash in missing_hashes:
+        with gzip.open(get_object_path(objects_dir, content_hash), 'rt', encoding='utf-8') as file:
+            htmls.append(file.read())
+    df_objects = pl.DataFrame({"_hashedId": missing_hashes, "html": htmls}, schema={"_hashedId": pl.String, "html": pl.String})
+
+    return df \
+        .join(df_objects, on="_hashedId", how="left", suffix="_object") \
+        .with_columns(pl.coalesce(["html", "html_object"]).alias("html")) \
+        .drop("html_object") \
+        .filter(pl.col("html").is_not_null())
+
+
+def run_eager(paths, objects_dir):
+    """
+    Silver before the lazy plan: the bronze blobs are downloaded in memory and decoded eagerly.
+    """
+    from assets.silver_assets.process_raw_epl_news import (
+        deduplicate_pages, extract_page_articles, explode_articles, filter_unwanted_titles
+    )
+    from utils.common_helpers import hash_series
+
+    dataframes = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            dataframes.append(pl.read_parquet(io.BytesIO(file.read())))
+    df = pl.concat(dataframes, how="diagonal_relaxed", rechunk=True)
+
+    df = deduplicate_pages(df)
+    df = resolve_local_objects(df, objects_dir)
+    df_pages = extract_page_articles(df, ENGINE)
+
+    df = explode_articles(df_pages).with_columns(
+        pl.concat_str(["teamName", "publishedDate", "title"]).alias("id")
+    )
+    df = df.with_columns(
+        pl.col("id").map_batches(lambda ids: hash_series(ids, length=16), return_dtype=pl.String)
+    ).unique(subset="id")
+    df_titles = df.select(["teamName", "title"])
+    df = filter_unwanted_titles(df).with_columns(pl.col("publishedDate").str.to_date())
+    return df_titles, len(df)
+
+
+def run_batched(paths, objects_dir):
+    """
+    Silver as process_raw_epl_news runs it: the bronze files are processed in batches of BATCH_FILES days,
+    each batch is extracted and written out (to a local Parquet file instead of the upsert) before the next.
+    """
+    from assets.silver_assets.process_raw_epl_news import split_cached_pages, extract_page_articles, build_silver_plan
+    from utils.html_helpers import PAGE_ARTICLES_DTYPE
+
+    lf_cache = pl.LazyFrame(schema={"_hashedId": pl.String, "extracted": PAGE_ARTICLES_DTYPE})
+    df_done = pl.DataFrame(schema={"_hashedId": pl.String})
+    titles_batches = []
+    num_rows = 0
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for batch_start in range(0, len(paths), BATCH_FILES):
+            _, df_misses = split_cached_pages(paths[batch_start:batch_start + BATCH_FILES], lf_cache, df_done)
+            df_done = pl.concat([df_done, df_misses.select("_hashedId")])
+
+            df_misses = resolve_local_objects(df_misses, objects_dir)
+            df_pages = extract_page_articles(df_misses, ENGINE)
+
+            lf_titles, lf_processed = build_silver_plan(df_pages.lazy())
+            df_titles, df_processed = pl.collect_all([lf_titles, lf_processed], engine="streaming")
+            df_processed.write_parquet(os.path.join(output_dir, f"{batch_start:06d}.parquet"))
+
+            titles_batches.append(df_titles)
+            num_rows += len(df_processed)
+
+    return pl.concat(titles_batches), num_rows
+
+
+MODES = {"eager": run_eager, "batched": run_batched}
+
+
+def generate_page(team_name: str, page: int, nb_articles: int, padding_bytes: int) -> str:
+    """
+    Builds a BBC-like team page: headline spans nested in articles, among scripts and navigation markup.
+    """
+    from utils.html_helpers import HEADLINE_CLASS, PARAGRAPH_CLASS
+
+    articles = []
+    for index in range(nb_articles):
+        day = random.randint(1, 28)
+        articles.append(
+            f'<article><span class="{HEADLINE_CLASS}"><span>{team_name} story {page}-{index}-{random.random():.6f}</span>'
+            f'<span data-testid="timestamp"><span data-testid="accessible-timestamp">{day} March</span></span></span>'
+            f'<p class="{PARAGRAPH_CLASS}">{"Lorem ipsum dolor sit amet. " * 20}</p></article>'
+        )
+    padding = '<script>var data = "' + 'x' * padding_bytes + '";</script>'
+    navigation = '<nav>' + '<a href="#">link</a>' * 200 + '</nav>'
+    return f"<html><head>{padding}</head><body>{navigation}{''.join(articles)}</body></html>"
+
+
+def generate(directory: str, days: int, layout: str, nb_teams: int = 20, nb_pages: int = 3, nb_articles: int = 10,
+             padding_bytes: int = 128 * 1024):
+    """
+    Writes daily bronze files, with the HTML in the files ('inline' layout) or
+    in objects ('content_addressed' layout).
+    """
+    from utils.common_helpers import hash_series
+    from utils.azure_blob_utils import get_object_path
+
+    bronze_dir = os.path.join(directory, "bronze")
+    objects_dir = os.path.join(directory, "objects")
+    os.makedirs(bronze_dir, exist_ok=True)
+
+    start = datetime(2025, 1, 1)
+    for day in range(days):
+        extracted_date = start + timedelta(days=day)
+        rows = [
+            (f"Team {team}", page, generate_page(f"Team {team}", page, nb_articles, padding_bytes))
+            for team in range(nb_teams) for page in range(1, nb_pages + 1)
+        ]
+        df = pl.DataFrame(rows, schema={"teamName": pl.String, "page": pl.Int8, "html": pl.String}, orient="row")
+        df = df.with_columns(
+            pl.col("html").map_batches(hash_series, return_dtype=pl.String).alias("_hashedId"),
+            pl.lit(extracted_date).alias("_extractedDate")
+        )
+
+        if layout == "inline":
+            df.select(["_hashedId", "_extractedDate", "teamName", "page", "html"]) \
+                .write_parquet(os.path.join(bronze_dir, f"epl_news_{extracted_date.strftime('%Y_%m_%d')}.parquet"))
+            continue
+
+        for content_hash, html in df.select(["_hashedId", "html"]).iter_rows():
+            object_path = get_object_path(objects_dir, content_hash)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            with open(object_path, 'wb') as file:
+                file.write(gzip.compress(html.encode('utf-8')))
+
+        df.select(["_hashedId", "_extractedDate", "teamName", "page"]) \
+            .with_columns(pl.lit(None, dtype=pl.String).alias("html")) \
+            .write_parquet(os.path.join(bronze_dir, f"epl_news_{extracted_date.strftime('%Y_%m_%d')}.parquet"))
+
+    return bronze_dir, objects_dir if layout == "content_addressed" else None
+
+
+def measure(mode: str, bronze_dir: str, objects_dir: str):
+    """
+    Runs one mode in the current process and prints its row count, duration and peak RSS.
+    """
+    paths = sorted(glob.glob(os.path.join(bronze_dir, "*.parquet")))
+    start = time.perf_counter()
+    _, num_rows = MODES[mode](paths, objects_dir)
+    duration = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<8}{len(paths):>8}{num_rows:>12}{duration:>12.1f}{peak_mib:>16,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bronze-dir")
+    parser.add_argument("--objects-dir")
+    parser.add_argument("--generate", help="Folder where a synthetic dataset is written and read")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--layout", choices=["content_addressed", "inline"], default="content_addressed")
+    parser.add_argument("--mode", choices=list(MODES))
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES),
+                        help="Modes to compare, the eager one needs memory for the HTML of every page")
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.bronze_dir, args.objects_dir)
+        return
+
+    if args.generate:
+        args.bronze_dir, args.objects_dir = generate(args.generate, args.days, args.layout)
+    elif args.bronze_dir is None:
+        parser.error("--bronze-dir or --generate is required")
+
+    print(f"{'mode':<8}{'files':>8}{'rows':>12}{'seconds':>12}{'peak RSS MiB':>16}")
+    for mode in args.modes:
+        command = [sys.executable, __file__, "--bronze-dir", args.bronze_dir, "--mode", mode]
+        if args.objects_dir:
+            command += ["--objects-dir", args.objects_dir]
+        subprocess.run(command, check=True)
+
+
+if __name__ == "__main__":
+    main()
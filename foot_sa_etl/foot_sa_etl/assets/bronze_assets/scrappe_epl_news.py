@@ -1,15 +1,21 @@
 # Standard library imports
 import os
 import sys
-import json
+import time
+import random
 import asyncio
-from typing import List, Tuple, Union, Optional
+import tempfile
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, BinaryIO, Callable, Dict, List, Set, Tuple, Union, Optional
+from urllib.parse import urlparse
 
 # Third-party imports
 import aiohttp
 import polars as pl
-from dotenv import load_dotenv
-from dagster import EnvVar
+import pyarrow.parquet as pq
 
 # Dagster imports
 from dagster import AssetExecutionContext, MaterializeResult, asset
@@ -18,19 +24,32 @@ from dagster import AssetExecutionContext, MaterializeResult, asset
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Local project utility imports
+from resources import PipelineConfigResource, StorageResource
 from utils.azure_blob_utils import (
-    create_blob_client_with_connection_string,
-    write_blob_to_container,
     read_blob_from_container,
-    merge_dataframes_on_id
+    write_json_to_container,
+    read_json_from_container,
+    write_html_objects,
+    upload_file_in_blocks,
+    get_parquet_writer_options,
+    list_parquet_blobs
 )
-from utils.common_helpers import get_current_datetime, generate_hash, create_blob_name
+from utils.common_helpers import get_current_datetime, hash_series, create_blob_name, create_title_key, parse_blob_name_date
+from utils.table_format import load_manifest, commit_manifest, register_parts
+from utils.key_index import get_key_index, filter_new_keys, add_keys_to_index
+from utils.html_helpers import extract_headline_titles, trim_to_articles
 
 
-load_dotenv()
+def build_page_url(base_url: str, team_slug: str, page_number: int) -> str:
+    """
+    Builds the URL of a page of a team on the website.
 
-# Get path of the config file
-scrapper_config_path = os.path.join(sys.path[-1], 'scrapper_config.json')
+    :param base_url: The base url of the website to scrap
+    :param team_slug: The name of the team in the URL
+    :param page_number: The page number
+    :return: The URL of the page
+    """
+    return f"{base_url}/{team_slug}/?page={page_number}"
 
 
 def get_teams_url(epl_teams, number_of_pages, base_url: str) -> List[List[Union[str, int, str]]]:
@@ -48,7 +67,7 @@ def get_teams_url(epl_teams, number_of_pages, base_url: str) -> List[List[Union[
     for team_name, value in epl_teams.items():
         for page_number in range(1, number_of_pages + 1):
             # Create a list of URLs for each team
-            url = f"{base_url}/{value}/?page={page_number}"
+            url = build_page_url(base_url, value, page_number)
             team_urls.append([team_name, page_number, url])
 
     return team_urls
@@ -84,41 +103,398 @@ def create_dataframe(input_df: List[List[Union[str, int, str]]], datetime_now: s
         pl.Series("_extractedDate", datetime_series)
     )
 
-    # Add a new "_hashedId" column by applying the generate_hash function to the "html" column
+    # Add a new "_hashedId" column by hashing the whole "html" column at once
     df = df.with_columns(
-        pl.col("html").map_elements(lambda x: generate_hash(x), return_dtype=pl.Utf8).alias("_hashedId")
+        pl.col("html").map_batches(hash_series, return_dtype=pl.Utf8).alias("_hashedId")
     )
 
     # Rearrange the columns
     return df.select(["_hashedId", "_extractedDate", "teamName", "page", "html"])
 
 
-async def get_page(team_name: str, page_number: int, url: str, session: aiohttp.ClientSession) -> List[str]:
+class BronzeParquetWriter:
+    """
+    Streams the scraped pages into a Parquet file spooled on disk. Pages are buffered until
+    `batch_size` of them are available, then turned into a DataFrame and written as one row group,
+    so that the memory used does not depend on the number of pages scraped.
+    When an `object_store` callable is given, the HTML bodies are handed to it and only the
+    references (_hashedId, _extractedDate, teamName, page) are written to the file.
+    With `trim_html`, pages are reduced to their article fragments before being buffered, and a
+    `sample_rate` share of the full pages is handed to `sample_store` for debugging.
+    The Parquet settings (codec, level, dictionary, statistics) come from `write_profile`.
+    A `key_filter` callable drops the pages already stored by previous runs.
+    The crawler hands the pages to `submit`, which runs the trimming, the key filter, the uploads
+    and the writes on the single thread of the writer, so they never block the event loop and
+    the pages are still written one batch at a time, in the order they were fetched.
+    """
+
+    def __init__(self, datetime_now: str, batch_size: int,
+                 object_store: Optional[Callable[[pl.DataFrame], int]] = None,
+                 trim_html: bool = False, sample_rate: float = 0.0,
+                 sample_store: Optional[Callable[[pl.DataFrame], int]] = None,
+                 write_profile: Optional[dict] = None,
+                 key_filter: Optional[Callable[[pl.DataFrame], pl.DataFrame]] = None):
+        self.datetime_now = datetime_now
+        self.key_filter = key_filter
+        self.write_profile = write_profile or {}
+        self.batch_size = batch_size
+        self.object_store = object_store
+        self.trim_html = trim_html
+        self.sample_rate = sample_rate
+        self.sample_store = sample_store
+        self.num_objects_uploaded = 0
+        self.num_samples = 0
+        self._samples: List[List[Union[str, int, str]]] = []
+        self.num_rows = 0
+        self.num_not_modified = 0
+        self.hashes: Set[str] = set()
+        self._buffer: List[List[Union[str, int, str]]] = []
+        self._file = tempfile.TemporaryFile()
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def add(self, result: List[Union[str, int, str]]) -> None:
+        """
+        Adds a scraped page to the buffer and flushes the buffer when it is full.
+        Pages answered with a 304 (None content) are only counted.
+
+        :param result: A list containing the team name, page number, and page content or error message
+        """
+        if not isinstance(result, list):
+            return
+        if result[2] is None:
+            self.num_not_modified += 1
+            return
+        if self.trim_html:
+            team_name, page_number, html = result
+            if self.sample_store is not None and random.random() < self.sample_rate:
+                self._samples.append(result)
+            result = [team_name, page_number, trim_to_articles(html)]
+        self._buffer.append(result)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    async def submit(self, result: List[Union[str, int, str]]) -> None:
+        """
+        Adds a scraped page from the event loop, the page is processed on the thread of the writer.
+
+        :param result: A list containing the team name, page number, and page content or error message
+        """
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.add, result)
+
+    def write_frame(self, df: pl.DataFrame) -> None:
+        """
+        Writes a bronze DataFrame as a row group, skipping the pages already written.
+
+        :param df: A DataFrame with the bronze schema
+        """
+        df = df.filter(~pl.col("_hashedId").is_in(list(self.hashes))).unique(subset="_hashedId")
+        if self.key_filter is not None and not df.is_empty():
+            df = self.key_filter(df)
+        if df.is_empty():
+            return
+
+        if self.object_store is not None and "html" in df.columns:
+            # Content-addressed layout: store the bodies aside, keep the references only
+            self.num_objects_uploaded += self.object_store(df)
+            df = df.drop("html")
+
+        table = df.to_arrow()
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._file, table.schema, **get_parquet_writer_options(self.write_profile))
+        self._writer.write_table(table.cast(self._writer.schema), row_group_size=self.write_profile.get('row_group_size'))
+
+        self.hashes.update(df.get_column("_hashedId").to_list())
+        self.num_rows += len(df)
+
+    def flush(self) -> None:
+        """
+        Writes the buffered pages as a row group and empties the buffer.
+        """
+        if self._buffer:
+            self.write_frame(create_dataframe(self._buffer, self.datetime_now))
+            self._buffer = []
+        if self._samples:
+            self.num_samples += self.sample_store(create_dataframe(self._samples, self.datetime_now))
+            self._samples = []
+
+    def close(self) -> BinaryIO:
+        """
+        Flushes the remaining pages and finalizes the Parquet file.
+
+        :return: The spooled file, positioned at its start
+        """
+        self.flush()
+        self._executor.shutdown()
+        if self._writer is not None:
+            self._writer.close()
+        self._file.seek(0)
+        return self._file
+
+
+class HostConcurrencyLimiter:
+    """
+    Caps the number of in-flight requests sent to a single host and adjusts the cap AIMD-style:
+    the limit grows by roughly one slot per window of successful, fast responses and is multiplied
+    by `decrease_factor` when the host answers with a 429, a 5xx or a response slower than
+    `latency_target`. A `Retry-After` header blocks the host until the given time has passed.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, latency_target: float,
+                 decrease_factor: float = 0.5):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """
+        Waits until the host is not blocked by a Retry-After and a concurrency slot is free.
+        """
+        async with self._condition:
+            while True:
+                blocked_for = self.blocked_until - time.monotonic()
+                if blocked_for > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=blocked_for)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                await self._condition.wait()
+
+    async def release(self) -> None:
+        """
+        Frees a concurrency slot and wakes up the waiting requests.
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self, latency: float) -> None:
+        """
+        Additive increase after a fast response, multiplicative decrease after a slow one.
+
+        :param latency: Time in seconds between sending the request and receiving the response headers
+        """
+        if latency > self.latency_target:
+            await self.on_backoff()
+            return
+        async with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    async def on_backoff(self, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicative decrease after a throttling signal (429, 5xx, timeout or slow response).
+        Decreases are applied at most once per `latency_target` so that a burst of errors coming
+        from the same window of requests does not collapse the limit to its minimum.
+
+        :param retry_after: Number of seconds the host asked us to wait, if any
+        """
+        async with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._condition.notify_all()
+
+
+class FetchScheduler:
+    """
+    Hands out one HostConcurrencyLimiter per host and keeps track of the achieved request rate.
+    """
+
+    def __init__(self, initial_concurrency: int, min_concurrency: int, max_concurrency: int,
+                 latency_target: float, max_retry_after: float):
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.max_retry_after = max_retry_after
+        self.requests_sent = 0
+        self._limiters: Dict[str, HostConcurrencyLimiter] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def limiter_for(self, url: str) -> HostConcurrencyLimiter:
+        """
+        Returns the limiter of the host of the given URL, creating it on first use.
+
+        :param url: The URL to request
+        :return: The HostConcurrencyLimiter of the URL's host
+        """
+        host = urlparse(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = HostConcurrencyLimiter(
+                self.initial_concurrency,
+                self.min_concurrency,
+                self.max_concurrency,
+                self.latency_target
+            )
+        return self._limiters[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """
+        Async context manager holding a concurrency slot on the URL's host for one request.
+
+        :param url: The URL to request
+        :return: The HostConcurrencyLimiter of the URL's host, to report the outcome of the request
+        """
+        limiter = self.limiter_for(url)
+        await limiter.acquire()
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        self.requests_sent += 1
+        try:
+            yield limiter
+        finally:
+            self._finished_at = time.monotonic()
+            await limiter.release()
+
+    def parse_retry_after(self, value: Optional[str]) -> Optional[float]:
+        """
+        Parses a Retry-After header given either in seconds or as an HTTP date.
+
+        :param value: The raw header value
+        :return: The number of seconds to wait (capped at max_retry_after), or None if absent or invalid
+        """
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.max_retry_after)
+
+    def requests_per_second(self) -> float:
+        """
+        Returns the achieved request rate between the first and the last request.
+        """
+        if self._started_at is None or self._finished_at is None or self._finished_at <= self._started_at:
+            return 0.0
+        return self.requests_sent / (self._finished_at - self._started_at)
+
+    def concurrency_limits(self) -> Dict[str, float]:
+        """
+        Returns the current concurrency limit of every host seen so far.
+        """
+        return {host: round(limiter.limit, 2) for host, limiter in self._limiters.items()}
+
+
+def create_fetch_scheduler(scheduler_config: dict) -> FetchScheduler:
+    """
+    Creates a FetchScheduler from the 'scheduler' section of the scrapper config.
+
+    :param scheduler_config: Dictionary with the scheduler settings
+    :return: A FetchScheduler object
+    """
+    return FetchScheduler(
+        initial_concurrency=scheduler_config['initial_concurrency'],
+        min_concurrency=scheduler_config['min_concurrency'],
+        max_concurrency=scheduler_config['max_concurrency'],
+        latency_target=scheduler_config['latency_target_seconds'],
+        max_retry_after=scheduler_config['max_retry_after_seconds']
+    )
+
+
+def get_conditional_headers(url: str, validators: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """
+    Builds the If-None-Match / If-Modified-Since headers for a URL from the validator cache.
+
+    :param url: The URL to request
+    :param validators: Dictionary mapping each URL to its last seen 'etag' and 'last_modified'
+    :return: A dictionary of HTTP headers, empty if the URL has never been fetched
+    """
+    headers = {}
+    url_validators = validators.get(url, {})
+    if url_validators.get('etag'):
+        headers['If-None-Match'] = url_validators['etag']
+    if url_validators.get('last_modified'):
+        headers['If-Modified-Since'] = url_validators['last_modified']
+    return headers
+
+
+def update_validators(url: str, response_headers, validators: Dict[str, Dict[str, str]]) -> None:
+    """
+    Stores the ETag and Last-Modified headers of a successful response in the validator cache.
+
+    :param url: The requested URL
+    :param response_headers: Headers of the HTTP response
+    :param validators: Dictionary mapping each URL to its last seen 'etag' and 'last_modified'
+    """
+    etag = response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    if etag or last_modified:
+        validators[url] = {'etag': etag, 'last_modified': last_modified}
+    else:
+        validators.pop(url, None)
+
+
+async def get_page(team_name: str, page_number: int, url: str, session: aiohttp.ClientSession,
+                   scheduler: FetchScheduler, validators: Optional[Dict[str, Dict[str, str]]] = None) -> List[str]:
     """
     Fetches the HTML content of a webpage asynchronously with retries in case of failure.
+    Requests go through the scheduler, which caps the concurrency per host and adapts it
+    to the 429s, 5xx responses and latency observed. When validators are given, the request
+    is conditional and a 304 response is returned with None instead of the HTML content.
 
     :param team_name: Name of the team
     :param page_number: Page number to fetch
     :param url: The URL to request
     :param session: An aiohttp ClientSession object for making requests
-    :return: A list containing the team name, page number, and either the HTML content or an error message
+    :param scheduler: The FetchScheduler shared by all the requests of the run
+    :param validators: Optional validator cache, updated in place with the new ETag/Last-Modified
+    :return: A list containing the team name, page number, and either the HTML content, None if
+             the page has not been modified, or an error message
     """
     retries = 3
     backoff_factor = 2
     delay = 1
+    headers = get_conditional_headers(url, validators) if validators is not None else {}
 
     for attempt in range(retries):
         try:
-            async with session.get(url) as response:
-                if 200 <= response.status < 300:
-                    print(f"Success: {team_name} Page {page_number}")
-                    return [team_name, page_number, await response.text()]
-                elif response.status == 429:  # too many requests code
-                    print(f"Error {response.status} for {url}, retrying for id {id}...")
-                    raise aiohttp.ClientError(f"HTTP error 429 for {url}")
-                else:
-                    print(f"Failed with status {response.status} for {team_name}, page {page_number}")
-                    return [team_name, page_number, f"HTTP error {response.status}"]
+            async with scheduler.slot(url) as limiter:
+                started_at = time.monotonic()
+                try:
+                    async with session.get(url, headers=headers) as response:
+                        latency = time.monotonic() - started_at
+                        if response.status == 304:  # not modified since the last scrape
+                            await limiter.on_success(latency)
+                            print(f"Not modified: {team_name} Page {page_number}")
+                            return [team_name, page_number, None]
+                        elif 200 <= response.status < 300:
+                            html = await response.text()
+                            await limiter.on_success(latency)
+                            if validators is not None:
+                                update_validators(url, response.headers, validators)
+                            print(f"Success: {team_name} Page {page_number}")
+                            return [team_name, page_number, html]
+                        elif response.status == 429 or response.status >= 500:  # throttled or server overloaded
+                            retry_after = scheduler.parse_retry_after(response.headers.get("Retry-After"))
+                            await limiter.on_backoff(retry_after)
+                            print(f"Error {response.status} for {url}, retrying for {team_name}, page {page_number}...")
+                            raise aiohttp.ClientError(f"HTTP error {response.status} for {url}")
+                        else:
+                            print(f"Failed with status {response.status} for {team_name}, page {page_number}")
+                            return [team_name, page_number, f"HTTP error {response.status}"]
+                except asyncio.TimeoutError:
+                    await limiter.on_backoff()
+                    raise
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print(f"Error {e}, retrying in {delay} seconds for {team_name}, page {page_number} (Attempt {attempt + 1}/{retries})")
             await asyncio.sleep(delay)
@@ -130,102 +506,339 @@ async def get_page(team_name: str, page_number: int, url: str, session: aiohttp.
             return [team_name, page_number, f"Failed after {retries} attempts"]
 
 
-async def get_all_pages(teams_details: List[Tuple[str, int, str]], session: aiohttp.ClientSession) -> List[List[str]]:
+def raise_task_errors(results: list) -> None:
+    """
+    Logs the exceptions returned by asyncio.gather and raises the first one. Fetch errors are
+    turned into results by get_page, an exception means a page was lost (the sink failed for instance).
+
+    :param results: The results of asyncio.gather called with return_exceptions=True
+    """
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        print(f"Crawl task failed: {error!r}")
+    if errors:
+        raise errors[0]
+
+
+async def get_all_pages(teams_details: List[Tuple[str, int, str]], session: aiohttp.ClientSession,
+                        scheduler: FetchScheduler,
+                        validators: Optional[Dict[str, Dict[str, str]]] = None,
+                        sink: Optional[Callable[[List[str]], Awaitable[None]]] = None) -> List[List[str]]:
     """
     Creates asynchronous tasks to fetch pages for all teams and collects the results.
+    The tasks are all created upfront, the scheduler decides how many of them hit the host at once.
 
     :param teams_details: A list of tuples where each tuple contains (team_name, page_number, url)
     :param session: An aiohttp ClientSession object for making requests
-    :return: A list of lists containing the team name, page number, and page content or error messages
+    :param scheduler: The FetchScheduler shared by all the requests of the run
+    :param validators: Optional validator cache used to send conditional requests
+    :param sink: Optional coroutine function awaited with each result as soon as it is fetched, instead of collecting them
+    :return: A list of lists containing the team name, page number, and page content or error messages,
+             empty when a sink is given
     """
-    tasks = [asyncio.create_task(get_page(team_name, page_number, url, session))
+    async def fetch(team_name: str, page_number: int, url: str):
+        result = await get_page(team_name, page_number, url, session, scheduler, validators)
+        if sink is None:
+            return result
+        await sink(result)
+
+    tasks = [asyncio.create_task(fetch(team_name, page_number, url))
              for team_name, page_number, url in teams_details]
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
+    raise_task_errors(results)
 
-    return results
+    return results if sink is None else []
 
 
-async def scrapper(urls: List[Tuple[str, int, str]]) -> List[List[str]]:
+async def scrapper(urls: List[Tuple[str, int, str]], scheduler: FetchScheduler,
+                   validators: Optional[Dict[str, Dict[str, str]]] = None,
+                   sink: Optional[Callable[[List[str]], Awaitable[None]]] = None) -> List[List[str]]:
     """
     Main asynchronous entry point that sets up the aiohttp session and fetches pages for all URLs.
 
     :param urls: A list of tuples where each tuple contains (team_name, page_number, url)
-    :return: A list of lists containing the team name, page number, and page content or error messages
+    :param scheduler: The FetchScheduler controlling the request concurrency
+    :param validators: Optional validator cache used to send conditional requests
+    :param sink: Optional coroutine function awaited with each result as soon as it is fetched
+    :return: A list of lists containing the team name, page number, and page content or error messages,
+             empty when a sink is given
     """
-    async with aiohttp.ClientSession() as session:
-        data = await get_all_pages(urls, session)
+    # The connector does not limit the number of connections, the scheduler does
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        data = await get_all_pages(urls, session, scheduler, validators, sink)
     return data
 
 
+def load_seen_title_keys(container_name: str, path_to_blob: str, blob_service_client) -> Set[str]:
+    """
+    Loads the keys of the article titles already processed by the silver layer.
+
+    :param container_name: Name of the container holding the seen-set
+    :param path_to_blob: Path to the seen-set Parquet file in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: A set of title keys, empty if the seen-set does not exist yet
+    """
+    df_seen: Optional[pl.DataFrame] = read_blob_from_container(container_name, path_to_blob, blob_service_client)
+    if df_seen is None:
+        return set()
+    return set(df_seen.get_column("titleKey").to_list())
+
+
+def is_page_already_seen(team_name: str, html: str, seen_keys: Set[str]) -> bool:
+    """
+    Tells whether every article listed on a page is already known. A page without any
+    article is not considered as seen: it is an error message (failed fetch, HTTP error)
+    or a page past the last one, neither tells that the following pages are known.
+
+    :param team_name: Name of the team
+    :param html: The HTML content of the page
+    :param seen_keys: Keys of the article titles already processed by the silver layer
+    :return: True if titles were found on the page and all of them are already known
+    """
+    page_keys = {create_title_key(team_name, title) for title in extract_headline_titles(html)}
+    return bool(page_keys) and page_keys <= seen_keys
+
+
+async def crawl_team(team_name: str, team_slug: str, base_url: str, max_pages: int,
+                     session: aiohttp.ClientSession, scheduler: FetchScheduler, seen_keys: Set[str],
+                     validators: Optional[Dict[str, Dict[str, str]]] = None,
+                     sink: Optional[Callable[[List[str]], Awaitable[None]]] = None) -> List[List[str]]:
+    """
+    Fetches the pages of a team in order and stops at the first page that has not been modified
+    or that only contains articles already known, since the following pages are older.
+
+    :param team_name: Name of the team
+    :param team_slug: The name of the team in the URL
+    :param base_url: The base url of the website to scrap
+    :param max_pages: The maximum number of pages to fetch
+    :param session: An aiohttp ClientSession object for making requests
+    :param scheduler: The FetchScheduler shared by all the requests of the run
+    :param seen_keys: Keys of the article titles already processed by the silver layer
+    :param validators: Optional validator cache used to send conditional requests
+    :param sink: Optional coroutine function awaited with each result as soon as it is fetched, instead of collecting them
+    :return: A list of lists containing the team name, page number, and page content or error messages,
+             empty when a sink is given
+    """
+    results = []
+
+    for page_number in range(1, max_pages + 1):
+        url = build_page_url(base_url, team_slug, page_number)
+        result = await get_page(team_name, page_number, url, session, scheduler, validators)
+
+        # 304: the page has not changed since the last scrape, the headlines are parsed off the event loop
+        is_last_page = result[2] is None or await asyncio.get_running_loop().run_in_executor(
+            None, is_page_already_seen, team_name, result[2], seen_keys
+        )
+
+        if sink is None:
+            results.append(result)
+        else:
+            await sink(result)
+
+        if is_last_page:
+            print(f"Stopping {team_name} after page {page_number}, no new articles")
+            break
+
+    return results
+
+
+async def incremental_scrapper(epl_teams: Dict[str, str], max_pages: int, base_url: str,
+                               scheduler: FetchScheduler, seen_keys: Set[str],
+                               validators: Optional[Dict[str, Dict[str, str]]] = None,
+                               sink: Optional[Callable[[List[str]], Awaitable[None]]] = None) -> List[List[str]]:
+    """
+    Asynchronous entry point of the incremental crawl: the teams are crawled concurrently,
+    the pages of a team one after the other until no new article is found.
+
+    :param epl_teams: A dictionary of team names and their corresponding values
+    :param max_pages: The maximum number of pages to fetch per team
+    :param base_url: The base url of the website to scrap
+    :param scheduler: The FetchScheduler controlling the request concurrency
+    :param seen_keys: Keys of the article titles already processed by the silver layer
+    :param validators: Optional validator cache used to send conditional requests
+    :param sink: Optional coroutine function awaited with each result as soon as it is fetched
+    :return: A list of lists containing the team name, page number, and page content or error messages,
+             empty when a sink is given
+    """
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [asyncio.create_task(crawl_team(team_name, team_slug, base_url, max_pages,
+                                                session, scheduler, seen_keys, validators, sink))
+                 for team_name, team_slug in epl_teams.items()]
+        teams_results = await asyncio.gather(*tasks, return_exceptions=True)
+    raise_task_errors(teams_results)
+
+    # Flatten the results of every team
+    return [result for team_results in teams_results if isinstance(team_results, list)
+            for result in team_results]
+
+
 @asset(group_name="epl_sentiment_analysis", compute_kind="polars")
-def scrappe_epl_news(context: AssetExecutionContext) -> MaterializeResult:
+def scrappe_epl_news(context: AssetExecutionContext, pipeline_config: PipelineConfigResource,
+                     storage: StorageResource) -> MaterializeResult:
     """
     This function scrapes EPL team news from BBC Sport and stores the data in Azure Blob Storage
     as a Parquet file. If existing data is found in the blob, it merges the new data with the old data.
+    Pages are requested conditionally with the ETag/Last-Modified stored next to the bronze data,
+    pages that have not been modified since the last scrape are skipped. In incremental crawl mode,
+    the pages of a team are fetched in order until a page only lists articles already in silver.
+    Pages are streamed to a Parquet file on disk by batches of 'write_batch_size' and the file is
+    uploaded block by block, so memory does not grow with the number of pages scraped.
+    In the content-addressed layout, the daily file only references HTML bodies stored once by hash.
+    With 'bronze_content' set to 'fragments', only the article nodes of the pages are kept.
 
     Parameters:
     - context (AssetExecutionContext): The execution context for the Dagster asset.
+    - pipeline_config (PipelineConfigResource): The settings of the pipeline.
+    - storage (StorageResource): The storage resource providing the pooled blob client.
 
     Returns:
     - None
     """
 
-    # Load the JSON file
-    with open(scrapper_config_path, 'r') as file:
-        scrapper_config = json.load(file)
+    # Settings of the pipeline and pooled blob client, shared by the assets of the run
+    scrapper_config = pipeline_config.as_dict()
+    blob_service_client = storage.get_client()
+    pool_stats_start = storage.get_pool_stats()
 
-    # Get the list of team URLs to scrape
-    team_urls = get_teams_url(
-        scrapper_config['teams'],
-        scrapper_config['nb_page'],
-        scrapper_config['base_url']
-    )
+    # Define the container and path for the blob storage
+    bronze_container_name = scrapper_config['bronze_container_name']
+    folder_name = scrapper_config['folder_name']
+    validators_path = f"{scrapper_config['state_folder_name']}/{folder_name}/page_validators.json"
+
+    # Load the ETag/Last-Modified of every page seen so far, to send conditional requests
+    validators = read_json_from_container(bronze_container_name, validators_path, blob_service_client) or {}
+
+    # Scheduler capping the number of concurrent requests sent to bbc.com
+    scheduler = create_fetch_scheduler(scrapper_config['scheduler'])
 
-    
-    # Scrape the data from the URLs asynchronously
-    results = asyncio.run(scrapper(team_urls))
-    
     # Get the current datetime
     datetime_now = get_current_datetime()
 
-    # Create a new Polars DataFrame from the scraped results
-    df_new = create_dataframe(results, datetime_now)
+    # In the content-addressed layout, HTML bodies are stored once under their SHA-256
+    object_store = None
+    if scrapper_config['bronze_layout'] == 'content_addressed':
+        objects_folder = f"{scrapper_config['objects_folder_name']}/{folder_name}"
+        object_store = lambda df: write_html_objects(df, bronze_container_name, objects_folder, blob_service_client)
+
+    # Full pages kept for debugging when bronze only stores the article fragments
+    samples_folder = f"{scrapper_config['samples_folder_name']}/{folder_name}"
+    sample_store = lambda df: write_html_objects(df, bronze_container_name, samples_folder, blob_service_client)
+
+    # Key index of the bronze table, the pages stored by previous runs are not written again
+    table_manifest = load_manifest(bronze_container_name, folder_name, blob_service_client)
+
+    # First run on the manifest layout: adopt the daily files written before the table had a manifest,
+    # the key index is then built over their pages too
+    if table_manifest["version"] == 0:
+        legacy_files = [
+            blob["name"] for blob in list_parquet_blobs(bronze_container_name, folder_name, blob_service_client)
+            if parse_blob_name_date(blob["name"]) is not None
+        ]
+        if legacy_files:
+            print(f"{len(legacy_files)} daily bronze files found, registering them in the manifest...")
+            table_manifest = register_parts(bronze_container_name, folder_name, legacy_files, "_hashedId", blob_service_client)
+
+    key_index = get_key_index(bronze_container_name, folder_name, "_hashedId", table_manifest, blob_service_client, scrapper_config['key_index'])
+    key_filter = lambda df: filter_new_keys(df, "_hashedId", key_index, bronze_container_name, blob_service_client)
+
+    # Pages are written to a Parquet file on disk by batches as soon as they are fetched
+    writer = BronzeParquetWriter(
+        datetime_now,
+        scrapper_config['write_batch_size'],
+        object_store,
+        trim_html=scrapper_config['bronze_content'] == 'fragments',
+        sample_rate=scrapper_config['full_html_sample_rate'],
+        sample_store=sample_store,
+        write_profile=scrapper_config['write_profiles']['bronze'],
+        key_filter=key_filter
+    )
 
-    # Load environment variables
-    connection_string = os.environ.get("CONN_STRING_AZURE_STORAGE")
-    if connection_string is None:
-        raise EnvironmentError("Azure storage connection string not found in environment variables.")
+    if scrapper_config['crawl_mode'] == 'incremental':
+        # Keys of the articles already in silver, to stop crawling a team at the first known page
+        seen_titles_path = f"{scrapper_config['state_folder_name']}/{folder_name}/seen_titles.parquet"
+        seen_keys = load_seen_title_keys(scrapper_config['silver_container_name'], seen_titles_path, blob_service_client)
+
+        # Scrape the pages of every team until no new article is found
+        asyncio.run(incremental_scrapper(
+            scrapper_config['teams'],
+            scrapper_config['nb_page'],
+            scrapper_config['base_url'],
+            scheduler,
+            seen_keys,
+            validators,
+            sink=writer.submit
+        ))
+    else:
+        # Get the list of team URLs to scrape
+        team_urls = get_teams_url(
+            scrapper_config['teams'],
+            scrapper_config['nb_page'],
+            scrapper_config['base_url']
+        )
 
-    # Create a blob client for Azure Blob Storage
-    blob_service_client = create_blob_client_with_connection_string(connection_string)
+        # Scrape the data from the URLs asynchronously
+        asyncio.run(scrapper(team_urls, scheduler, validators, sink=writer.submit))
 
-    # Define the container and path for the blob storage
-    bronze_container_name = scrapper_config['bronze_container_name']
-    folder_name = scrapper_config['folder_name']
-    blob_name = create_blob_name(datetime_now)
-    path = f"{folder_name}/{blob_name}.parquet"
+    # Write the last batch of pages
+    writer.flush()
 
-    # Read the existing blob data from Azure Blob Storage, if available
-    df_actual: Optional[pl.DataFrame] = read_blob_from_container(bronze_container_name, path, blob_service_client)
+    # Every run writes a new immutable part, named after the day and time of the run
+    blob_name = create_blob_name(datetime_now)
+    path = f"{folder_name}/{blob_name}_{datetime_now.split(' ')[1].replace(':', '')}.parquet"
 
-    if df_actual is None:
-        # If no existing data, write the new DataFrame directly to the blob
-        print("No existing data found, writing new data to blob...")
-        write_blob_to_container(df_new, bronze_container_name, path, blob_service_client)
-        df_merged = None # For the ternary operator
+    if writer.num_rows == 0:
+        # Every page answered with a 304, nothing to write
+        print("No modified pages found, nothing to write...")
+        writer.close().close()
     else:
-        # If existing data is found, merge it with the new data
-        print("Existing data found, merging with new data...")
-        df_merged = merge_dataframes_on_id(df_actual, df_new, "_hashedId")
-
-        # Write the merged DataFrame back to the blob
-        write_blob_to_container(df_merged, bronze_container_name, path, blob_service_client)
+        # Upload the spooled Parquet file, staging its blocks in parallel
+        write_profile = scrapper_config['write_profiles']['bronze']
+        with writer.close() as parquet_file:
+            upload_file_in_blocks(
+                parquet_file,
+                bronze_container_name,
+                path,
+                blob_service_client,
+                write_profile['block_size'],
+                write_profile['max_concurrency']
+            )
+
+        # Record the part in the bronze table manifest, the pages of previous runs are not read again
+        part = {
+            "path": path,
+            "num_rows": writer.num_rows,
+            "partition": {},
+            "key_min": min(writer.hashes),
+            "key_max": max(writer.hashes)
+        }
+        commit_manifest(bronze_container_name, folder_name, table_manifest, blob_service_client, [part])
+        add_keys_to_index(
+            key_index,
+            pl.Series(list(writer.hashes), dtype=pl.String),
+            writer.num_rows,
+            bronze_container_name,
+            folder_name,
+            blob_service_client,
+            scrapper_config['key_index']
+        )
+
+    # Persist the validators only once the pages they describe are stored in bronze
+    write_json_to_container(validators, bronze_container_name, validators_path, blob_service_client)
 
     print("Operation completed successfully.")
 
     return MaterializeResult(
         metadata={
-            "num_records": len(df_merged if df_merged is not None else df_new) # ternary operator
+            **storage.get_pool_stats(since=pool_stats_start),
+            "num_records": writer.num_rows,
+            "num_requests": scheduler.requests_sent,
+            "num_not_modified": writer.num_not_modified,
+            "num_objects_uploaded": writer.num_objects_uploaded,
+            "num_full_html_samples": writer.num_samples,
+            "requests_per_second": round(scheduler.requests_per_second(), 2),
+            "concurrency_limits": scheduler.concurrency_limits()
         }
     )
@@ -1,16 +1,13 @@
 # Standard library imports
 import os
 import sys
-import json
 
 # Third-party library imports
-from dotenv import load_dotenv
 import polars as pl
 
 # Dagster imports
 from dagster import (
     AssetExecutionContext,
-    MaterializeResult,
     asset
 )
 
@@ -18,11 +15,8 @@ from dagster import (
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Local project utility imports
-from utils.azure_blob_utils import (
-    create_blob_client_with_connection_string, 
-    read_all_parquets_from_container, 
-    write_blob_to_container
-)
+from resources import PipelineConfigResource, StorageResource
+from utils.table_format import read_table
 from utils.common_helpers import generate_hash
 
 # load assets bronze_scrappe_epl_news
@@ -30,12 +24,6 @@ from utils.common_helpers import generate_hash
 from assets.silver_assets.process_raw_epl_news import process_raw_epl_news
 
 
-load_dotenv()
-
-# Get path of the config file
-scrapper_config_path = os.path.join(sys.path[-1], 'scrapper_config.json')
-
-
 def process_team_table(df):
     """
     Processes a DataFrame to create a unique team dimension table. The function extracts unique team names 
@@ -89,40 +77,31 @@ def process_dim_article_table(df):
 @asset(
         deps=[process_raw_epl_news],
         group_name="epl_sentiment_analysis",
-        compute_kind="polars"
+        compute_kind="polars",
+        io_manager_key="gold_io_manager"
 )
-def article(context: AssetExecutionContext) -> MaterializeResult:
-    # Load the JSON file
-    with open(scrapper_config_path, 'r') as file:
-        scrapper_config = json.load(file)
-
-    # Load environment variables
-    connection_string = os.environ.get("CONN_STRING_AZURE_STORAGE")
-    if connection_string is None:
-        raise EnvironmentError("Azure storage connection string not found in environment variables.")
-
-    # Create a blob client for Azure Blob Storage
-    blob_service_client = create_blob_client_with_connection_string(connection_string)
+def article(context: AssetExecutionContext, pipeline_config: PipelineConfigResource,
+            storage: StorageResource) -> pl.DataFrame:
+    # Settings of the pipeline and pooled blob client, shared by the assets of the run
+    scrapper_config = pipeline_config.as_dict()
+    blob_service_client = storage.get_client()
+    pool_stats_start = storage.get_pool_stats()
     # List all blobs in the container
 
     silver_container_name = scrapper_config['silver_container_name']
     folder_name = scrapper_config['folder_name']
+    table_folder = f"{folder_name}/{scrapper_config['silver_blob_name']}"
 
-    df = read_all_parquets_from_container(silver_container_name, folder_name, blob_service_client)
+    df = read_table(silver_container_name, table_folder, blob_service_client)
 
     df_processed = process_dim_article_table(df)
 
-    # Define the container and path for the blob storage
-    gold_container_name = scrapper_config['gold_container_name']
-    folder_name = scrapper_config['folder_name']
-    path = f"{folder_name}/article.parquet"
-
-    write_blob_to_container(df_processed, gold_container_name, path, blob_service_client)
-
     print("Operation completed successfully.")
 
-    return MaterializeResult(
-        metadata={
-            "num_records": len(df_processed) # ternary operator
-        }
-    )
\ No newline at end of file
+    # The frame is written to the gold container by the gold IO manager
+    context.add_output_metadata({
+        **storage.get_pool_stats(since=pool_stats_start),
+        "num_records": len(df_processed)
+    })
+
+    return df_processed
@@ -1,39 +1,20 @@
 # Standard library imports
 import os
 import sys
-import json
 
 # Third-party library imports
-from dotenv import load_dotenv
 import polars as pl
 
 # Dagster imports
 from dagster import (
     AssetExecutionContext,
-    MaterializeResult,
+    AssetIn,
     asset
 )
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
-# Local project utility imports
-from utils.azure_blob_utils import (
-    create_blob_client_with_connection_string,
-    read_blob_from_container,
-    write_blob_to_container
-)
-
-# load assets reaction and dim_sentiment
-# in order to be used as dependency
-from assets.gold_assets.fact_assets.fact_reaction import fact_reaction
-from assets.gold_assets.fact_assets.fact_title import fact_title
-
-
-load_dotenv()
-
-# Get path of the config file
-scrapper_config_path = os.path.join(sys.path[-1], 'scrapper_config.json')
 
 def create_sentiment_trend_table(
         df_fact_reaction: pl.DataFrame,
@@ -94,45 +75,30 @@ def create_sentiment_trend_table(
 
 
 @asset(
-    deps=[fact_reaction, fact_title],
+    ins={
+        "df_fact_reaction": AssetIn("fact_reaction"),
+        "df_fact_title": AssetIn("fact_title"),
+        "df_sentiment": AssetIn("dim_sentiment"),
+        "df_date": AssetIn("dim_date")
+    },
     group_name="epl_sentiment_analysis",
-    compute_kind="polars"
+    compute_kind="polars",
+    io_manager_key="gold_io_manager",
+    metadata={"blob_name": "df_fact_sentiment_trend"}
 )
-def fact_sentiment_trend(context: AssetExecutionContext) -> MaterializeResult:
-    # Load the JSON file
-    with open(scrapper_config_path, 'r') as file:
-        scrapper_config = json.load(file)
-
-    # Load environment variables
-    connection_string = os.environ.get("CONN_STRING_AZURE_STORAGE")
-    if connection_string is None:
-        raise EnvironmentError("Azure storage connection string not found in environment variables.")
-
-    # Create a blob client for Azure Blob Storage
-    blob_service_client = create_blob_client_with_connection_string(connection_string)
-    # List all blobs in the container
-    
-    gold_container_name = scrapper_config['gold_container_name']
-    folder_name = scrapper_config['folder_name']
-
+def fact_sentiment_trend(context: AssetExecutionContext,
+                         df_fact_reaction: pl.DataFrame,
+                         df_fact_title: pl.DataFrame,
+                         df_sentiment: pl.DataFrame,
+                         df_date: pl.DataFrame) -> pl.DataFrame:
     # PROCESSING
-    df_fact_reaction = read_blob_from_container(gold_container_name, f"{folder_name}/fact_reaction.parquet", blob_service_client)
-    df_fact_title = read_blob_from_container(gold_container_name, f"{folder_name}/fact_title.parquet", blob_service_client)
-    df_sentiment = read_blob_from_container(gold_container_name, f"{folder_name}/dim_sentiment.parquet", blob_service_client)
-    df_date = read_blob_from_container(gold_container_name, f"{folder_name}/dim_date.parquet", blob_service_client)
-
     df_fact_sentiment_trend = create_sentiment_trend_table(df_fact_reaction, df_fact_title, df_sentiment, df_date)
 
-    # Define the container and path for the blob storage
-    folder_name = scrapper_config['folder_name']
-    path = f"{folder_name}/df_fact_sentiment_trend.parquet"
-
-    write_blob_to_container(df_fact_sentiment_trend, gold_container_name, path, blob_service_client)
-
     print("Operation completed successfully.")
 
-    return MaterializeResult(
-        metadata={
-            "num_records": len(df_fact_sentiment_trend) # ternary operator
-        }
-    )
+    # The frame is written to the gold container by the gold IO manager
+    context.add_output_metadata({
+        "num_records": len(df_fact_sentiment_trend)
+    })
+
+    return df_fact_sentiment_trend
@@ -1,16 +1,14 @@
 # Standard library imports
 import os
 import sys
-import json
 
 # Third-party library imports
-from dotenv import load_dotenv
 import polars as pl
 
 # Dagster imports
 from dagster import (
     AssetExecutionContext,
-    MaterializeResult,
+    AssetIn,
     asset
 )
 
@@ -18,25 +16,8 @@ from dagster import (
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 # Local project utility imports
-from utils.azure_blob_utils import (
-    create_blob_client_with_connection_string,
-    read_blob_from_container,
-    write_blob_to_container
-)
-
 from utils.common_helpers import extract_sentiment
 
-# load assets reaction and dim_sentiment
-# in order to be used as dependency
-from assets.gold_assets.article import article
-from assets.gold_assets.dim_assets.dim_sentiment import dim_sentiment
-
-
-load_dotenv()
-
-# Get path of the config file
-scrapper_config_path = os.path.join(sys.path[-1], 'scrapper_config.json')
-
 
 def create_fact_title(
         df_article: pl.DataFrame,
@@ -78,7 +59,6 @@ def process_title_reaction(
         df_sentiment: pl.DataFrame
         ) -> pl.DataFrame:
     
-    
 
     # Return the new Polars DataFrame containing sentiment analysis
     df_fact_title = df_fact_title.with_columns(
@@ -103,43 +83,25 @@ def process_title_reaction(
 
 
 @asset(
-    deps=[article, dim_sentiment],
+    ins={
+        "df_article": AssetIn("article"),
+        "df_sentiment": AssetIn("dim_sentiment")
+    },
     group_name="epl_sentiment_analysis",
-    compute_kind="polars"
+    compute_kind="polars",
+    io_manager_key="gold_io_manager"
 )
-def fact_title(context: AssetExecutionContext) -> MaterializeResult:
-    
-    # Load the JSON file
-    with open(scrapper_config_path, 'r') as file:
-        scrapper_config = json.load(file)
-
-    # Load environment variables
-    connection_string = os.environ.get("CONN_STRING_AZURE_STORAGE")
-    if connection_string is None:
-        raise EnvironmentError("Azure storage connection string not found in environment variables.")
-
-    # Create a blob client for Azure Blob Storage
-    blob_service_client = create_blob_client_with_connection_string(connection_string)
-    # List all blobs in the container
-    
-    gold_container_name = scrapper_config['gold_container_name']
-    folder_name = scrapper_config['folder_name']
-
+def fact_title(context: AssetExecutionContext,
+               df_article: pl.DataFrame,
+               df_sentiment: pl.DataFrame) -> pl.DataFrame:
     # PROCESSING
-    df_article = read_blob_from_container(gold_container_name, f"{folder_name}/article.parquet", blob_service_client)
-    df_sentiment = read_blob_from_container(gold_container_name, f"{folder_name}/dim_sentiment.parquet", blob_service_client)
     df_fact_title = create_fact_title(df_article, df_sentiment, threshold=0.2)
 
-    # Define the container and path for the blob storage
-    folder_name = scrapper_config['folder_name']
-    path = f"{folder_name}/fact_title.parquet"
-
-    write_blob_to_container(df_fact_title, gold_container_name, path, blob_service_client)
-
     print("Operation completed successfully.")
 
-    return MaterializeResult(
-        metadata={
-            "num_records": len(df_fact_title) # ternary operator
-        }
-    )
\ No newline at end of file
+    # The frame is written to the gold container by the gold IO manager
+    context.add_output_metadata({
+        "num_records": len(df_fact_title)
+    })
+
+    return df_fact_title
@@ -1,13 +1,11 @@
 # Standard library imports
 import os
 import sys
-import json
-from datetime import datetime
-from typing import Optional
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple, Union
 
 # Third-party library imports
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
 import polars as pl
 
 # Dagster imports
@@ -21,132 +19,303 @@ from dagster import (
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Local project utility imports
+from resources import PipelineConfigResource, StorageResource
 from utils.azure_blob_utils import (
-    create_blob_client_with_connection_string, 
-    read_all_parquets_from_container, 
+    list_parquet_blobs,
+    download_blobs_to_directory,
     write_blob_to_container, 
     read_blob_from_container, 
-    merge_dataframes_on_id
+    write_json_to_container,
+    read_json_from_container,
+    read_html_objects,
+    list_partitions
 )
-from utils.common_helpers import generate_hash
+from utils.table_format import load_manifest, is_data_part_path, register_parts, upsert_table, compact_table, vacuum_table
+from utils.common_helpers import hash_series, get_current_datetime, parse_blob_name_date
+from utils.html_helpers import get_extraction_engine_version, extract_fields_series, PAGE_ARTICLES_DTYPE
 
 # load assets scrappe_epl_news
 # in order to be used as dependency
 from assets.bronze_assets.scrappe_epl_news import scrappe_epl_news
 
 
-load_dotenv()
+def scan_bronze_files(paths: List[str]) -> pl.LazyFrame:
+    """
+    Lazily scans local bronze Parquet files. Files written with an older layout may miss some
+    columns, they are concatenated diagonally.
 
-# Get path of the config file
-scrapper_config_path = os.path.join(sys.path[-1], 'scrapper_config.json')
+    :param paths: Local paths of the bronze Parquet files
+    :return: A LazyFrame over the bronze pages, without the unused 'page' column
+    """
+    lf = pl.concat([pl.scan_parquet(path) for path in paths], how="diagonal_relaxed")
+    return lf.select(pl.exclude("page"))
 
 
+def deduplicate_pages(df: Union[pl.DataFrame, pl.LazyFrame]) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Keeps the first extraction of every page body: the same '_hashedId' always gives the same fields.
 
-def extract_html_fields(html: str) -> tuple:
+    :param df: Bronze DataFrame or LazyFrame
+    :return: The DataFrame with one row per '_hashedId'
     """
-    Extracts 'publishedDate', 'title', and 'content' from the given HTML string.
+    if "html" not in df.collect_schema().names():
+        df = df.with_columns(pl.lit(None, dtype=pl.String).alias("html"))
+
+    return df.sort("_extractedDate").unique(subset="_hashedId", keep="first", maintain_order=True)
 
-    :param html: The HTML content as a string
-    :return: A tuple containing (publishedDate, title, content)
+
+def split_cached_pages(paths: List[str], lf_cache: pl.LazyFrame, df_done: pl.DataFrame) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Scans a batch of local bronze files, one row per page body, leaving out the bodies handled by an
+    earlier batch, and splits the pages into extraction cache hits and misses. Only the cache misses
+    have their html column materialized.
+
+    :param paths: Local paths of the bronze Parquet files of the batch
+    :param lf_cache: LazyFrame of the cached pages with '_hashedId' and 'extracted' columns
+    :param df_done: DataFrame with the '_hashedId' of the page bodies handled by the earlier batches
+    :return: A tuple (hits with an 'extracted' column, misses with an 'html' column)
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    lf = deduplicate_pages(scan_bronze_files(paths)).join(df_done.lazy(), on="_hashedId", how="anti")
 
-    # Find all articles based on the class
-    articles = soup.find_all('span', class_='ssrcss-189b1h2-HeadlineWrap')
-    
-    # Default values
-    published_date = "No date found"
-    title = "No title found"
-    full_text = "No content found"
-    
-    if articles:
-        for article in articles:
-            # Extract title
-            title = article.find('span').get_text() if article.find('span') else "No title found"
-            
-            # Extract published date
-            timestamp = article.find('span', {'data-testid': 'timestamp'})
-            if timestamp:
-                published_date = timestamp.find('span', {'data-testid': 'accessible-timestamp'}).get_text()
-            else:
-                published_date = "No date found"
-            
-            # Extract all paragraphs related to the article
-            text_content = []
-            parent_article = article.find_parent('article')
-            if parent_article:
-                paragraphs = parent_article.find_all('p', class_='ssrcss-1q0x1qg-Paragraph e1jhz7w10')
-                text_content = [p.get_text() for p in paragraphs]
-
-            full_text = ' '.join(text_content) if text_content else "No content found"
-
-    # Return as a dictionary (which Polars can convert to a Struct)
-    return {
-        "publishedDate": published_date,
-        "title": title,
-        "content": full_text
-    }
-
-
-def parse_published_date(date_str: str) -> str:
+    df_hits, df_misses = pl.collect_all([
+        lf.drop("html").join(lf_cache, on="_hashedId", how="inner"),
+        lf.join(lf_cache, on="_hashedId", how="anti")
+    ])
+    return df_hits, df_misses
+
+
+def resolve_html_references(df: pl.DataFrame, container_name: str, objects_folder: str, blob_service_client) -> pl.DataFrame:
     """
-    Parses a published date string like 'published at 22:46 2 October' and converts
-    it to a 'YYYY-MM-DD' format.
-    
-    :param date_str: The date string to be parsed
-    :return: A formatted date string
+    Fills the 'html' column of bronze rows stored in the content-addressed layout. Pages are first
+    deduplicated on '_hashedId' (the same body always gives the same fields), so that each body
+    is downloaded once, and only for the rows that reference it.
+
+    :param df: Bronze DataFrame, 'html' is missing or null for content-addressed rows
+    :param container_name: Name of the bronze container
+    :param objects_folder: Folder holding the HTML objects in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The deduplicated DataFrame with the 'html' column filled
+    """
+    df = deduplicate_pages(df)
+
+    missing_hashes = df.filter(pl.col("html").is_null()).get_column("_hashedId").to_list()
+    if not missing_hashes:
+        return df
+
+    df_objects = read_html_objects(missing_hashes, container_name, objects_folder, blob_service_client)
+
+    return df \
+        .join(df_objects, on="_hashedId", how="left", suffix="_object") \
+        .with_columns(pl.coalesce(["html", "html_object"]).alias("html")) \
+        .drop("html_object") \
+        .filter(pl.col("html").is_not_null())
+
+
+def load_extraction_cache(container_name: str, path_to_blob: str, blob_service_client) -> pl.DataFrame:
+    """
+    Loads the cache of the articles extracted from each page body, keyed by '_hashedId' and by the
+    'engine' that extracted them (engine name and parser version, see get_extraction_engine_version).
+
+    :param container_name: Name of the container holding the cache
+    :param path_to_blob: Path to the cache Parquet file in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: DataFrame with '_hashedId', 'engine', 'extracted' and 'lastUsed' columns, empty if there is no cache yet
     """
-    try:
-        # Remove the 'published at' prefix and split the time and date
-        date_str = date_str.replace('published at ', '').strip()
-        time_part, day_part, month_part = date_str.split()
+    df_cache: Optional[pl.DataFrame] = read_blob_from_container(container_name, path_to_blob, blob_service_client)
+    if df_cache is None:
+        return pl.DataFrame(schema={
+            "_hashedId": pl.String,
+            "engine": pl.String,
+            "extracted": PAGE_ARTICLES_DTYPE,
+            "lastUsed": pl.Datetime
+        })
+
+    # Entries written before the engine was recorded are never served, they expire with the retention
+    if "engine" not in df_cache.columns:
+        df_cache = df_cache.with_columns(pl.lit(None, dtype=pl.String).alias("engine"))
+    return df_cache.select(["_hashedId", "engine", "extracted", "lastUsed"])
+
+
+def update_extraction_cache(df_cache: pl.DataFrame, df_pages: pl.DataFrame, engine_version: str,
+                            retention_days: int, max_entries: int) -> pl.DataFrame:
+    """
+    Adds the pages of this run to the extraction cache and refreshes their 'lastUsed' date, then
+    evicts the entries unused for more than `retention_days` and, above `max_entries`,
+    the least recently used ones.
+
+    :param df_cache: The current extraction cache
+    :param df_pages: The pages of this run, with '_hashedId' and 'extracted' columns
+    :param engine_version: Engine and parser version that extracted the pages of this run
+    :param retention_days: Number of days an unused entry is kept
+    :param max_entries: Maximum number of entries of the cache
+    :return: The updated extraction cache
+    """
+    now = datetime.strptime(get_current_datetime(), '%Y-%m-%d %H:%M:%S')
+
+    df_used = df_pages.select(["_hashedId", "extracted"]).with_columns(
+        pl.lit(engine_version, dtype=pl.String).alias("engine"),
+        pl.lit(now, dtype=pl.Datetime).alias("lastUsed")
+    ).select(["_hashedId", "engine", "extracted", "lastUsed"])
+
+    df_cache = pl.concat([
+        df_used,
+        df_cache.join(df_used, on=["_hashedId", "engine"], how="anti", nulls_equal=True).select(df_used.columns)
+    ])
 
-        # Current year (assumed, can be replaced with logic to determine the correct year)
-        current_year = datetime.now().year
+    return df_cache \
+        .filter(pl.col("lastUsed") >= now - timedelta(days=retention_days)) \
+        .sort("lastUsed", descending=True) \
+        .head(max_entries)
 
-        # Convert the string into a datetime object
-        datetime_obj = datetime.strptime(f"{time_part} {day_part} {month_part} {current_year}", "%H:%M %d %B %Y")
 
-        # Return the date in the desired format
-        return datetime_obj.strftime("%Y-%m-%d")
-    except Exception as e:
-        print(f"Error parsing date: {date_str}, Error: {e}")
-        return None  # or handle the error as needed
+# Month number of the abbreviated month names used by BBC Sport
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
 
-def process_html_column(df: pl.DataFrame) -> pl.DataFrame:
+# Number of seconds of the units of relative dates such as '2 hours ago' or '5 mins ago'
+RELATIVE_UNITS = {"second": 1, "minute": 60, "min": 60, "hour": 3600, "day": 86400, "week": 604800}
+
+
+def parse_published_dates(date_column: str = "publishedDate", reference_column: str = "_extractedDate") -> pl.Expr:
+    """
+    Builds a vectorized expression parsing published date strings into 'YYYY-MM-DD' strings.
+    Handled formats are 'published at 22:46 2 October', '2 October 2023', '2 hours ago', '1 min ago',
+    'Yesterday' and 'Today'. When the year is missing, it is inferred from the extraction date:
+    a day and month later than the extraction date belong to the previous year.
+
+    :param date_column: Name of the column holding the published date strings
+    :param reference_column: Name of the datetime column holding the extraction date of the page
+    :return: A Polars expression evaluating to the formatted dates, null when the date cannot be parsed
+    """
+    text = pl.col(date_column) \
+        .str.to_lowercase() \
+        .str.replace(r"^\s*(published|updated)(\s+at)?\s+", "") \
+        .str.strip_chars()
+
+    reference = pl.col(reference_column)
+    reference_date = reference.dt.date()
+
+    # Relative dates: '<amount> <unit>(s) ago'
+    relative_pattern = rf"^(\d+)\s+({'|'.join(RELATIVE_UNITS)})s?\s+ago$"
+    amount = text.str.extract(relative_pattern, 1).cast(pl.Int64)
+    unit_seconds = text.str.extract(relative_pattern, 2).replace_strict(RELATIVE_UNITS, default=None, return_dtype=pl.Int64)
+    relative_date = (reference - pl.duration(seconds=amount * unit_seconds)).dt.date()
+
+    # Absolute dates: '<day> <month name>( <year>)', possibly preceded by the time
+    absolute_pattern = r"(\d{1,2})\s+([a-z]+)(?:\s+(\d{4}))?$"
+    day = text.str.extract(absolute_pattern, 1).cast(pl.Int32)
+    month = text.str.extract(absolute_pattern, 2).str.slice(0, 3).replace_strict(MONTHS, default=None, return_dtype=pl.Int32)
+    explicit_year = text.str.extract(absolute_pattern, 3).cast(pl.Int32)
+
+    # Without a year, a date later in the year than the extraction date was published the year before
+    reference_year = reference.dt.year().cast(pl.Int32)
+    is_after_reference = month * 100 + day > reference.dt.month().cast(pl.Int32) * 100 + reference.dt.day().cast(pl.Int32)
+    inferred_year = pl.when(is_after_reference).then(reference_year - 1).otherwise(reference_year)
+    year = pl.coalesce([explicit_year, inferred_year])
+
+    # Invalid dates (31 February...) become null instead of raising
+    absolute_date = pl.concat_str(
+        [
+            year.cast(pl.Utf8),
+            month.cast(pl.Utf8).str.zfill(2),
+            day.cast(pl.Utf8).str.zfill(2)
+        ],
+        separator="-"
+    ).str.to_date("%Y-%m-%d", strict=False)
+
+    return pl.when(text == "yesterday").then(reference_date - pl.duration(days=1)) \
+        .when(text.is_in(["today", "just now"])).then(reference_date) \
+        .when(amount.is_not_null()).then(relative_date) \
+        .otherwise(absolute_date) \
+        .dt.strftime("%Y-%m-%d")
+
+
+def extract_page_articles(df: pl.DataFrame, engine: str = "bs4", workers: int = 1, chunk_size: int = 64) -> pl.DataFrame:
     """
-    Optimized version of processing the 'html' column in the Polars DataFrame. This
-    function calls the HTML processing function only once per row and extracts
-    'publishedDate', 'title', and 'content' in a single operation.
+    Replaces the 'html' column of the pages with an 'extracted' column holding the list of the
+    articles of each page. With several workers, the column is sharded in chunks parsed by a process pool.
 
     :param df: Input Polars DataFrame containing an 'html' column
-    :return: A new DataFrame with 'publishedDate', 'title', and 'content' columns
+    :param engine: Name of the extraction engine to use ('bs4' or 'lxml')
+    :param workers: Number of parsing processes, 1 to parse in the current process, 0 for one per CPU
+    :param chunk_size: Number of pages sent to a parsing process at a time
+    :return: The DataFrame with an 'extracted' column instead of the 'html' one
     """
-    # delete rows that were not correctly retreived
-    df = df.filter(pl.col('html') == 'HTTP error 500')
-
-    # Apply the extraction function once and unpack the result into three new columns
-    new_columns = df.select(
-        pl.col("html").map_elements(extract_html_fields, return_dtype=pl.Struct([
-            pl.Field("publishedDate", pl.Utf8), 
-            pl.Field("title", pl.Utf8),
-            pl.Field("content", pl.Utf8)
-        ])).alias("extracted")
-    ).unnest("extracted")
-
-    # Parse the publishedDate column and convert it to a proper date format
-    new_columns = new_columns.with_columns(
-        pl.col("publishedDate").map_elements(parse_published_date, return_dtype=pl.Utf8).alias("publishedDate")
-    )
+    # Pages that were not correctly retrieved hold an error message and yield no article
+    df = df.filter(pl.col('html').is_not_null())
+
+    # Apply the extraction function once per page
+    return df.with_columns(
+        extract_fields_series(df.get_column("html"), engine, workers, chunk_size).alias("extracted")
+    ).drop("html")
 
-    df = df.with_columns(new_columns)
+
+def explode_articles(df: Union[pl.DataFrame, pl.LazyFrame]) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Turns the pages and their list of extracted articles into one row per article.
+
+    :param df: Polars DataFrame or LazyFrame containing '_extractedDate', 'teamName' and 'extracted' columns
+    :return: A new DataFrame with 'teamName', 'publishedDate', 'title', and 'content' columns
+    """
+    df = df.explode("extracted").filter(pl.col("extracted").is_not_null())
+
+    # Unpack the article structs into three new columns
+    df = df.unnest("extracted")
+
+    # Parse the publishedDate column in a single columnar pass, the year is inferred from the extraction date
+    df = df.with_columns(
+        parse_published_dates("publishedDate", "_extractedDate").alias("publishedDate")
+    )
 
     columns_to_keep = ["teamName", "publishedDate", "title", "content"]
     
     return df.select(columns_to_keep)
 
 
-def filter_unwanted_titles(df: pl.DataFrame) -> pl.DataFrame:
+def build_silver_plan(lf_pages: pl.LazyFrame) -> Tuple[pl.LazyFrame, pl.LazyFrame]:
+    """
+    Builds the silver transform of the extracted pages as lazy plans: articles are exploded,
+    the unwanted titles are filtered before the ids are hashed, then the articles are
+    deduplicated on their id.
+
+    :param lf_pages: LazyFrame of the pages with '_extractedDate', 'teamName' and 'extracted' columns
+    :return: A tuple (titles plan, processed articles plan). The titles plan keeps every scraped
+             title, it feeds the seen-set of the incremental crawl.
+    """
+    lf_articles = explode_articles(lf_pages)
+
+    lf_titles = lf_articles.select(["teamName", "title"]).unique()
+
+    # The id depends on the title, filtering before the deduplication gives the same result
+    lf_processed = filter_unwanted_titles(lf_articles) \
+        .with_columns(
+            #  create primary key based on columns teamName
+            #  publishedDate and title, hashed and sliced to 16 characters
+            pl.concat_str(
+                [
+                    pl.col("teamName"),
+                    pl.col("publishedDate"),
+                    pl.col("title")
+                ]
+            ).map_batches(lambda ids: hash_series(ids, length=16), return_dtype=pl.String).alias("id")
+        ) \
+        .filter(
+            # The id is null when the date of the article was not found, such rows cannot be keyed
+            pl.col("id").is_not_null()
+        ) \
+        .unique(subset="id") \
+        .with_columns(
+            # Cast column 'publishedDate' into date format
+            pl.col('publishedDate').str.to_date()
+        ) \
+        .select(["teamName", "publishedDate", "title", "content", "id"])
+
+    return lf_titles, lf_processed
+
+
+def filter_unwanted_titles(df: Union[pl.DataFrame, pl.LazyFrame]) -> Union[pl.DataFrame, pl.LazyFrame]:
     """
     Filters out rows in a Polars DataFrame where the 'title' column contains unwanted patterns.
     These patterns correspond to specific phrases or structures found in sports articles that should be excluded.
@@ -173,100 +342,211 @@ def filter_unwanted_titles(df: pl.DataFrame) -> pl.DataFrame:
     return df_filtered
 
 
+def update_seen_title_keys(df: pl.DataFrame, container_name: str, path_to_blob: str, blob_service_client) -> int:
+    """
+    Adds the title keys of the processed articles to the seen-set used by the incremental crawl
+    of the bronze layer. The seen-set is a single-column Parquet file holding 16 characters keys.
+
+    :param df: A Polars DataFrame containing 'teamName' and 'title' columns
+    :param container_name: Name of the container holding the seen-set
+    :param path_to_blob: Path to the seen-set Parquet file in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The number of keys in the updated seen-set
+    """
+    # Same key as create_title_key, computed for the whole column at once
+    df_keys = df.select(
+        pl.concat_str([pl.col("teamName"), pl.col("title")]).map_batches(
+            lambda titles: hash_series(titles, length=16), return_dtype=pl.String
+        ).alias("titleKey")
+    )
+
+    # Union with the keys already known, a failed read must not overwrite the seen-set with this run's keys only
+    df_seen: Optional[pl.DataFrame] = read_blob_from_container(container_name, path_to_blob, blob_service_client, raise_errors=True)
+    if df_seen is not None:
+        df_keys = pl.concat([df_seen.select("titleKey"), df_keys])
+
+    df_keys = df_keys.unique().sort("titleKey")
+    write_blob_to_container(df_keys, container_name, path_to_blob, blob_service_client)
+
+    return len(df_keys)
+
 
 @asset(
         deps=[scrappe_epl_news],
         group_name="epl_sentiment_analysis",
         compute_kind="polars"
 )
-def process_raw_epl_news(context: AssetExecutionContext) -> MaterializeResult:
+def process_raw_epl_news(context: AssetExecutionContext, pipeline_config: PipelineConfigResource,
+                         storage: StorageResource) -> MaterializeResult:
     """
     This function processes scraped EPL news data stored in Azure Blob Storage. 
     It reads Parquet files, processes HTML content, generates a unique ID, and uploads the processed data 
-    to a new container in Azure Blob Storage.
+    to a new container in Azure Blob Storage. A manifest of the bronze blobs (name and ETag) already
+    folded into silver is kept, so only new or changed bronze blobs are downloaded and parsed.
+    The bronze blobs are processed in batches of 'silver_batch_files' days, from extraction to the
+    upsert, so that the pages of a long backlog are never held in memory at once.
 
     :param context: The context object provided by Dagster to log and track asset execution.
+    :param pipeline_config: The settings of the pipeline
+    :param storage: The storage resource providing the pooled blob client
     """
 
-    # Load the JSON file
-    with open(scrapper_config_path, 'r') as file:
-        scrapper_config = json.load(file)
-
-    # Load environment variables
-    connection_string = os.environ.get("CONN_STRING_AZURE_STORAGE")
-    if connection_string is None:
-        raise EnvironmentError("Azure storage connection string not found in environment variables.")
-
-    # Create a blob client for Azure Blob Storage
-    blob_service_client = create_blob_client_with_connection_string(connection_string)
+    # Settings of the pipeline and pooled blob client, shared by the assets of the run
+    scrapper_config = pipeline_config.as_dict()
+    blob_service_client = storage.get_client()
+    pool_stats_start = storage.get_pool_stats()
     # List all blobs in the container
 
     bronze_container_name = scrapper_config['bronze_container_name']
+    silver_container_name = scrapper_config['silver_container_name']
     folder_name = scrapper_config['folder_name']
 
-    df = read_all_parquets_from_container(bronze_container_name, folder_name, blob_service_client)
+    # Manifest of the bronze blobs already processed, mapping each blob name to its ETag.
+    # Only a missing manifest means a first run, a failed read must not reprocess the whole bronze history
+    manifest_path = f"{scrapper_config['state_folder_name']}/{folder_name}/bronze_manifest.json"
+    manifest = read_json_from_container(silver_container_name, manifest_path, blob_service_client, raise_errors=True) or {}
+
+    # Bronze only writes the blob of the current day, blobs older than the last processed day cannot have changed
+    processed_dates = [blob_date for blob_date in map(parse_blob_name_date, manifest) if blob_date is not None]
+    start_date = max(processed_dates) if processed_dates else None
+
+    # Keep the bronze blobs that are new or have been rewritten since the last run
+    bronze_blobs = list_parquet_blobs(bronze_container_name, folder_name, blob_service_client, start_date=start_date)
+    # The key index files of the bronze table are not pages
+    bronze_blobs = [blob for blob in bronze_blobs if parse_blob_name_date(blob["name"]) is not None]
+    new_blobs = [blob for blob in bronze_blobs if manifest.get(blob["name"]) != blob["etag"]]
+
+    if not new_blobs:
+        print("No new bronze data found, nothing to process.")
+        return MaterializeResult(
+            metadata={
+                **storage.get_pool_stats(since=pool_stats_start),
+                "num_bronze_blobs_processed": 0
+            }
+        )
 
-    df_processed = process_html_column(df)
+    # Pages already parsed by a previous run are served by the extraction cache
+    cache_config = scrapper_config['extraction_cache']
+    cache_path = f"{scrapper_config['state_folder_name']}/{folder_name}/extraction_cache.parquet"
+    df_cache = load_extraction_cache(silver_container_name, cache_path, blob_service_client)
 
-    #  create primary key based on columns teamName
-    #  publishedDate and title
-    df_processed = df_processed.with_columns(
-        pl.concat_str(
-            [
-                pl.col("teamName"),
-                pl.col("publishedDate"),
-                pl.col("title")
-            ]
-        ).alias("id")
-    )
+    # Only the entries extracted by the configured engine and parser version can be served
+    engine_version = get_extraction_engine_version(scrapper_config['extraction_engine'])
+    lf_cache = df_cache.lazy().filter(pl.col("engine") == engine_version).select(["_hashedId", "extracted"])
 
-    # hash the the column id
-    df_processed = df_processed.with_columns(
-            pl.col("id").map_elements(generate_hash, return_dtype=pl.String).alias("id")
+    # Define the container and folder of the partitioned silver table
+    silver_blob_name = scrapper_config['silver_blob_name']
+    table_folder = f"{folder_name}/{silver_blob_name}"
+    partition_by = scrapper_config['silver_partition_by']
+    write_profile = scrapper_config['write_profiles']['silver']
+
+    # First run on the manifest layout: adopt the existing partition files, or the former single-file table
+    if load_manifest(silver_container_name, table_folder, blob_service_client)["version"] == 0:
+        existing_files = [
+            partition["name"] for partition in list_partitions(silver_container_name, table_folder, blob_service_client)
+            if is_data_part_path(table_folder, partition["name"])
+        ]
+        if existing_files:
+            print(f"{len(existing_files)} partition files found, registering them in the manifest...")
+            register_parts(silver_container_name, table_folder, existing_files, "id", blob_service_client)
+        else:
+            df_legacy: Optional[pl.DataFrame] = read_blob_from_container(silver_container_name, f"{table_folder}.parquet", blob_service_client)
+            if df_legacy is not None:
+                print("Single-file silver table found, migrating it to the manifest layout...")
+                upsert_table(df_legacy, silver_container_name, table_folder, "id", blob_service_client, partition_by, write_profile)
+
+    # Daily blobs in date order, so that a page body is extracted with the first day it was scraped
+    new_blobs = sorted(new_blobs, key=lambda blob: blob["name"])
+    batch_files = scrapper_config['silver_batch_files']
+    objects_folder = f"{scrapper_config['objects_folder_name']}/{folder_name}"
+
+    df_done = pl.DataFrame(schema={"_hashedId": pl.String})
+    titles_batches = []
+    num_hits, num_misses, num_inserted, num_updated = 0, 0, 0, 0
+
+    for batch_start in range(0, len(new_blobs), batch_files):
+        batch_blobs = new_blobs[batch_start:batch_start + batch_files]
+        print(f"Processing bronze blobs {batch_start + 1} to {batch_start + len(batch_blobs)} of {len(new_blobs)}...")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = download_blobs_to_directory(bronze_container_name, [blob["name"] for blob in batch_blobs], tmp_dir, blob_service_client)
+            df_hits, df_misses = split_cached_pages(paths, lf_cache, df_done)
+        print(f"Extraction cache: {len(df_hits)} hits, {len(df_misses)} misses")
+        df_done = pl.concat([df_done, df_hits.select("_hashedId"), df_misses.select("_hashedId")])
+
+        # Download the HTML bodies referenced by the content-addressed bronze files
+        df_misses = resolve_html_references(df_misses, bronze_container_name, objects_folder, blob_service_client)
+
+        df_misses = extract_page_articles(
+            df_misses,
+            scrapper_config['extraction_engine'],
+            scrapper_config['parse_workers'],
+            scrapper_config['parse_chunk_size']
         )
 
-    # slice the "id" column
-    df_processed = df_processed.with_columns(
-            pl.col("id").str.slice(0, 16)
-        )
+        df_pages = pl.concat([df_hits, df_misses.select(df_hits.columns)])
 
-    # Keep unique rows based on column "id"
-    df_processed = df_processed.unique(subset="id")
+        # Build the whole transform of the batch as one lazy plan and collect both outputs in a single pass
+        lf_titles, lf_processed = build_silver_plan(df_pages.lazy())
+        df_titles, df_processed = pl.collect_all(
+            [lf_titles, lf_processed],
+            engine="streaming" if scrapper_config['silver_streaming'] else "auto"
+        )
 
-    # clean df_processed by removing some of the records based on title
-    df_processed = filter_unwanted_titles(df_processed)
+        # New articles and articles whose content changed are written as new part files
+        _, batch_inserted, batch_updated = upsert_table(
+            df_processed,
+            silver_container_name,
+            table_folder,
+            "id",
+            blob_service_client,
+            partition_by,
+            write_profile,
+            index_config=scrapper_config['key_index']
+        )
 
-    # Cast column 'publishedDate'into datetime format
-    df_processed = df_processed.with_columns(
-        pl.col('publishedDate').str.to_date()
+        # Store the extracted articles of the batch's pages for the next runs
+        df_cache = update_extraction_cache(df_cache, df_pages, engine_version, cache_config['retention_days'], cache_config['max_entries'])
+
+        titles_batches.append(df_titles)
+        num_hits += len(df_hits)
+        num_misses += len(df_misses)
+        num_inserted += batch_inserted
+        num_updated += batch_updated
+
+    # Merge the partitions made of many small parts, then drop the files no recent version reads
+    compaction_config = scrapper_config['table_compaction']
+    compact_table(
+        silver_container_name,
+        table_folder,
+        "id",
+        blob_service_client,
+        compaction_config['target_rows'],
+        compaction_config['min_parts'],
+        write_profile
     )
+    vacuum_table(silver_container_name, table_folder, blob_service_client, compaction_config['retain_versions'])
 
-    # Define the container and path for the blob storage
-    silver_container_name = scrapper_config['silver_container_name']
-    silver_blob_name = scrapper_config['silver_blob_name']
-    folder_name = scrapper_config['folder_name']
-    path = f"{folder_name}/{silver_blob_name}.parquet"
-
-    # Read the existing blob data from Azure Blob Storage, if available
-    df_actual: Optional[pl.DataFrame] = read_blob_from_container(silver_container_name, path, blob_service_client)
+    # Update the seen-set read by the incremental crawl of the bronze layer
+    seen_titles_path = f"{scrapper_config['state_folder_name']}/{folder_name}/seen_titles.parquet"
+    update_seen_title_keys(pl.concat(titles_batches), silver_container_name, seen_titles_path, blob_service_client)
 
-    if df_actual is None:
-        # If no existing data, write the new DataFrame directly to the blob
-        print("No existing data found, writing new data to blob...")
-        write_blob_to_container(df_processed, silver_container_name, path, blob_service_client)
-        df_merged = None # for ternary operator
-    else:
-        # If existing data is found, merge it with the new data
-        print("Existing data found, merging with new data...")
-        df_merged = merge_dataframes_on_id(df_actual, df_processed, "id")
+    # Store the extraction cache updated by the batches for the next runs
+    write_blob_to_container(df_cache, silver_container_name, cache_path, blob_service_client)
 
-        # Write the merged DataFrame back to the blob
-        write_blob_to_container(df_merged, silver_container_name, path, blob_service_client)
+    # Record the bronze blobs folded into silver by this run
+    manifest.update({blob["name"]: blob["etag"] for blob in new_blobs})
+    write_json_to_container(manifest, silver_container_name, manifest_path, blob_service_client)
 
     print("Operation completed successfully.")
 
     return MaterializeResult(
         metadata={
-            "num_records": len(df_merged if df_merged is not None else df_processed) # ternary operator
+            **storage.get_pool_stats(since=pool_stats_start),
+            "num_records": num_inserted,
+            "num_updated_records": num_updated,
+            "num_bronze_blobs_processed": len(new_blobs),
+            "num_extraction_cache_hits": num_hits,
+            "num_extraction_cache_misses": num_misses
         }
     )
\ No newline at end of file
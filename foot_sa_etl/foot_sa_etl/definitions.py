@@ -1,8 +1,11 @@
+import os
 import warnings
 import dagster
+from dotenv import load_dotenv
 
 from dagster import (
     Definitions,
+    EnvVar,
     ScheduleDefinition,
     define_asset_job,
     load_assets_from_package_module,
@@ -26,11 +29,23 @@ from .assets.gold_assets.fact_assets.fact_reaction import fact_reaction
 from .assets.gold_assets.fact_assets.fact_title import fact_title
 from .assets.gold_assets.fact_assets.fact_sentiment_trend import fact_sentiment_trend
 
+# The assets add the project root to sys.path and import the resources from there,
+# they are imported the same way so that a single copy of the module holds the pooled clients
+from resources import PipelineConfigResource, PolarsParquetIOManager, StorageResource
+
 
 # from assets import 
 
 warnings.filterwarnings("ignore", category=dagster.ExperimentalWarning)
 
+load_dotenv()
+
+# Get path of the config file
+scrapper_config_path = os.path.join(os.path.dirname(__file__), 'scrapper_config.json')
+
+pipeline_config = PipelineConfigResource.from_json(scrapper_config_path)
+storage = StorageResource(connection_string=EnvVar("CONN_STRING_AZURE_STORAGE"))
+
 daily_refresh_schedule = ScheduleDefinition(
     job=define_asset_job(name="all_assets_job"), cron_schedule="0 0 * * *"
 )
@@ -53,4 +68,9 @@ all_assets = with_source_code_references(
 defs = Definitions(
     assets=all_assets,
     schedules=[daily_refresh_schedule],
+    resources={
+        "pipeline_config": pipeline_config,
+        "storage": storage,
+        "gold_io_manager": PolarsParquetIOManager(storage=storage, pipeline_config=pipeline_config, layer="gold")
+    },
 )
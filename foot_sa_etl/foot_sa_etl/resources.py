@@ -0,0 +1,363 @@
+# Standard library imports
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+# Third-party library imports
+import polars as pl
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+
+# Dagster imports
+from dagster import Config, ConfigurableIOManager, ConfigurableResource, InputContext, OutputContext
+
+# Local project utility imports
+from utils.azure_blob_utils import (
+    create_blob_client_with_connection_string,
+    write_blob_to_container,
+    read_blob_from_container,
+    get_blob_cache_stats
+)
+
+
+# Pooled clients of this process, keyed by the settings of the StorageResource that created them
+_storage_clients = {}
+_storage_clients_lock = threading.Lock()
+
+# Local copies written by the IO manager in this process, mapping each blob to its copy and ETag
+_local_copies = {}
+_local_copies_lock = threading.Lock()
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter counting the requests it sends and the connections its pools open,
+    every request that did not open a connection reused one kept alive by the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.num_requests = 0
+        self.num_connections = 0
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                adapter.count_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                adapter.count_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool
+        }
+
+    def count_connection(self):
+        with self._lock:
+            self.num_connections += 1
+
+    def send(self, request, *args, **kwargs):
+        with self._lock:
+            self.num_requests += 1
+        return super().send(request, *args, **kwargs)
+
+
+class StorageResource(ConfigurableResource):
+    """
+    Azure Blob Storage client shared by the assets of a run. One BlobServiceClient is created per
+    process and per settings, on top of a requests session whose connection pool is sized for the
+    thread pools of the parallel reads and block uploads, so TCP/TLS connections are reused across assets.
+    """
+
+    connection_string: str
+    pool_connections: int = 4
+    pool_maxsize: int = 32
+    max_retries: int = 0
+    connection_timeout: int = 20
+    read_timeout: int = 120
+
+    def _client_key(self) -> tuple:
+        return (self.connection_string, self.pool_connections, self.pool_maxsize,
+                self.max_retries, self.connection_timeout, self.read_timeout)
+
+    def get_client(self) -> BlobServiceClient:
+        """
+        Returns the pooled BlobServiceClient of this process, creating it on first use.
+
+        :return: BlobServiceClient object
+        """
+        key = self._client_key()
+        with _storage_clients_lock:
+            if key not in _storage_clients:
+                # Retries are handled by the Azure pipeline, not by the adapter
+                adapter = CountingHTTPAdapter(pool_connections=self.pool_connections,
+                                              pool_maxsize=self.pool_maxsize,
+                                              max_retries=self.max_retries)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                transport = RequestsTransport(session=session, session_owner=False,
+                                              connection_timeout=self.connection_timeout,
+                                              read_timeout=self.read_timeout)
+                client = create_blob_client_with_connection_string(self.connection_string, transport=transport)
+                _storage_clients[key] = (client, adapter)
+            return _storage_clients[key][0]
+
+    def get_pool_stats(self, since: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """
+        Returns the number of requests sent by the pooled client of this process, and how many of them
+        opened a new connection or reused a pooled one, along with the hits and misses of the local
+        blob cache. The counters are cumulative for the process, an asset takes a snapshot when it
+        starts and reports the difference with `since`.
+
+        :param since: Stats returned by an earlier call, the result is the difference with them
+        :return: Dictionary with 'storage_requests', 'storage_connections_opened', 'storage_connections_reused',
+                 'blob_cache_hits' and 'blob_cache_misses'
+        """
+        num_requests, num_connections = 0, 0
+        with _storage_clients_lock:
+            entry = _storage_clients.get(self._client_key())
+        if entry is not None:
+            adapter = entry[1]
+            with adapter._lock:
+                num_requests, num_connections = adapter.num_requests, adapter.num_connections
+
+        stats = {
+            "storage_requests": num_requests,
+            "storage_connections_opened": num_connections,
+            "storage_connections_reused": max(num_requests - num_connections, 0),
+            **get_blob_cache_stats()
+        }
+        if since is not None:
+            stats = {name: value - since.get(name, 0) for name, value in stats.items()}
+        return stats
+
+
+class WriteProfileConfig(Config):
+    compression: str = "snappy"
+    compression_level: Optional[int] = None
+    row_group_size: Optional[int] = None
+    use_dictionary: bool = True
+    write_statistics: bool = True
+    block_size: int = 4 * 1024 * 1024
+    max_concurrency: int = 1
+
+
+class WriteProfilesConfig(Config):
+    bronze: WriteProfileConfig
+    silver: WriteProfileConfig
+    gold: WriteProfileConfig
+
+
+class TableCompactionConfig(Config):
+    target_rows: int
+    min_parts: int
+    retain_versions: int
+
+
+class KeyIndexConfig(Config):
+    false_positive_rate: float
+    min_capacity: int
+    max_segments: int
+    segment_rows: int
+
+
+class ExtractionCacheConfig(Config):
+    retention_days: int
+    max_entries: int
+
+
+class SchedulerConfig(Config):
+    initial_concurrency: int
+    min_concurrency: int
+    max_concurrency: int
+    latency_target_seconds: float
+    max_retry_after_seconds: float
+
+
+class PipelineConfigResource(ConfigurableResource):
+    """
+    Typed settings of the pipeline, loaded once from scrapper_config.json and shared by the assets.
+    """
+
+    base_url: str
+    nb_page: int
+    crawl_mode: str
+    write_batch_size: int
+    bronze_container_name: str
+    silver_container_name: str
+    gold_container_name: str
+    folder_name: str
+    state_folder_name: str
+    objects_folder_name: str
+    samples_folder_name: str
+    bronze_layout: str
+    bronze_content: str
+    full_html_sample_rate: float
+    extraction_engine: str
+    parse_workers: int
+    parse_chunk_size: int
+    silver_streaming: bool
+    silver_batch_files: int
+    write_profiles: WriteProfilesConfig
+    table_compaction: TableCompactionConfig
+    key_index: KeyIndexConfig
+    silver_partition_by: Dict[str, str]
+    extraction_cache: ExtractionCacheConfig
+    silver_blob_name: str
+    scheduler: SchedulerConfig
+    teams: Dict[str, str]
+
+    @classmethod
+    def from_json(cls, config_path: str) -> "PipelineConfigResource":
+        """
+        Creates the resource from a JSON config file, the file is validated against the typed fields.
+
+        :param config_path: Path of the scrapper_config.json file
+        :return: A PipelineConfigResource object
+        """
+        with open(config_path, 'r') as file:
+            return cls(**json.load(file))
+
+    def as_dict(self) -> dict:
+        """
+        Returns the settings as the nested dictionary of the JSON config file,
+        the optional settings of the write profiles that are not set are left out.
+
+        :return: Dictionary of the settings
+        """
+        config = self.model_dump()
+        for profile in config['write_profiles'].values():
+            for name in [name for name, value in profile.items() if value is None]:
+                del profile[name]
+        return config
+
+
+class PolarsParquetIOManager(ConfigurableIOManager):
+    """
+    IO manager storing the Polars DataFrames returned by the assets as Parquet blobs. Every output is
+    also written to an uncompressed Arrow IPC file on local disk, under the folder of its run, so that
+    the downstream assets of the run memory-map it instead of downloading the blob written seconds earlier.
+    Copies written by earlier runs of the process are reused while the ETag of the blob is unchanged,
+    the blob is only read when no local copy can be used.
+    The blob is named after the asset, unless the asset sets a 'blob_name' in its metadata.
+    """
+
+    storage: StorageResource
+    pipeline_config: PipelineConfigResource
+    layer: str = "gold"
+    local_dir: Optional[str] = None
+    local_retention_hours: float = 24
+
+    def _get_local_root(self) -> str:
+        return self.local_dir or os.path.join(tempfile.gettempdir(), "foot_sa_etl_handoff")
+
+    def _get_blob_path(self, asset_name: str, definition_metadata: Optional[dict]) -> str:
+        blob_name = (definition_metadata or {}).get("blob_name", asset_name)
+        return f"{self.pipeline_config.folder_name}/{blob_name}.parquet"
+
+    def _get_local_path(self, run_id: str, asset_name: str) -> str:
+        return os.path.join(self._get_local_root(), run_id, f"{asset_name}.arrow")
+
+    def _prune_local_copies(self, run_id: str) -> None:
+        """
+        Removes the folders of the runs older than 'local_retention_hours'.
+
+        :param run_id: The current run, whose folder is kept
+        """
+        local_root = self._get_local_root()
+        expiry = time.time() - self.local_retention_hours * 3600
+        for entry in os.scandir(local_root):
+            if entry.is_dir() and entry.name != run_id and entry.stat().st_mtime < expiry:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def handle_output(self, context: OutputContext, obj: pl.DataFrame) -> None:
+        scrapper_config = self.pipeline_config.as_dict()
+        container_name = scrapper_config[f"{self.layer}_container_name"]
+        write_profile = scrapper_config['write_profiles'][self.layer]
+        asset_name = context.asset_key.path[-1]
+        blob_path = self._get_blob_path(asset_name, context.definition_metadata)
+        blob_service_client = self.storage.get_client()
+        pool_stats_start = self.storage.get_pool_stats()
+
+        # Blob storage remains the copy read by the other jobs and by the dashboards
+        write_blob_to_container(obj, container_name, blob_path, blob_service_client, write_profile)
+        etag = blob_service_client.get_blob_client(container_name, blob_path).get_blob_properties().etag
+
+        # Uncompressed Arrow IPC, read_ipc memory-maps it so the downstream assets do not decode or copy it
+        local_path = self._get_local_path(context.run_id, asset_name)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_path = f"{local_path}.tmp"
+        obj.write_ipc(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, local_path)
+
+        with _local_copies_lock:
+            _local_copies[(container_name, blob_path)] = (local_path, etag)
+
+        self._prune_local_copies(context.run_id)
+
+        context.add_output_metadata({
+            "blob_path": f"{container_name}/{blob_path}",
+            "local_copy": local_path,
+            **self.storage.get_pool_stats(since=pool_stats_start)
+        })
+
+    def _load(self, context: InputContext) -> Tuple[pl.DataFrame, str, str]:
+        """
+        Loads an input from the first usable copy.
+
+        :param context: The input context of the downstream asset
+        :return: A tuple (DataFrame, source of the copy, path of the copy)
+        """
+        container_name = self.pipeline_config.as_dict()[f"{self.layer}_container_name"]
+        asset_name = context.asset_key.path[-1]
+        blob_path = self._get_blob_path(asset_name, context.upstream_output.definition_metadata)
+
+        # Output of the current run, written by an upstream step on this machine
+        local_path = self._get_local_path(context.run_id, asset_name)
+        if os.path.exists(local_path):
+            return pl.read_ipc(local_path), "local_run", local_path
+
+        # Output of an earlier run of this process, used while the blob has not been rewritten since
+        blob_service_client = self.storage.get_client()
+        with _local_copies_lock:
+            local_copy = _local_copies.get((container_name, blob_path))
+        if local_copy is not None and os.path.exists(local_copy[0]):
+            etag = blob_service_client.get_blob_client(container_name, blob_path).get_blob_properties().etag
+            if etag == local_copy[1]:
+                return pl.read_ipc(local_copy[0]), "local_process", local_copy[0]
+
+        df = read_blob_from_container(container_name, blob_path, blob_service_client)
+        if df is None:
+            raise FileNotFoundError(f"Blob '{blob_path}' not found in container '{container_name}'.")
+        return df, "blob", f"{container_name}/{blob_path}"
+
+    def load_input(self, context: InputContext) -> pl.DataFrame:
+        pool_stats_start = self.storage.get_pool_stats()
+        start = time.perf_counter()
+        df, source, path = self._load(context)
+
+        context.log.info(f"Loaded {context.asset_key.path[-1]} from {source} copy {path}")
+        context.add_input_metadata({
+            "load_source": source,
+            "load_path": path,
+            "load_seconds": round(time.perf_counter() - start, 3),
+            "num_records": len(df),
+            **self.storage.get_pool_stats(since=pool_stats_start)
+        })
+        return df
@@ -1,133 +1,852 @@
+import os
 import re
-from typing import Union, List
+import gzip
+import json
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+import io
+import glob
+from contextlib import contextmanager
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Collection, Dict, Iterator, Optional, Tuple, Union, List
 from io import BytesIO
-from azure.storage.blob import BlobServiceClient
+from urllib.parse import quote, unquote
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient, BlobBlock
 import polars as pl
+import pyarrow.parquet as pq
 
+from utils.common_helpers import parse_blob_name_date
 
-def create_blob_client_with_connection_string(connection_string: str) -> BlobServiceClient:
+# flock is POSIX-only: without it (Windows) cache entries cannot be pinned across processes,
+# LocalBlobCache.open_path then reads every blob through a private temporary file instead
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Listing snapshots of this process, keyed by (account, container, prefix), see list_parquet_blobs
+LISTING_CACHE_TTL_SECONDS = 300
+_listing_cache = {}
+
+# Size of the blocks staged by block uploads
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Projected reads of blobs smaller than this download the whole blob, see read_parquet_blob
+RANGE_READ_MIN_BYTES = 8 * 1024 * 1024
+
+# Local copies of the downloaded blobs, see get_blob_cache
+BLOB_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+_blob_cache = None
+
+
+def create_blob_client_with_connection_string(connection_string: str, **client_kwargs) -> BlobServiceClient:
     """
     Creates a BlobServiceClient using a connection string, handling URL-encoded characters.
 
     :param connection_string: The Azure Storage connection string
+    :param client_kwargs: Keyword arguments passed to the client, such as a pooled 'transport'
     :return: BlobServiceClient object
     """
     connection_string = re.sub(r'%2B', '+', connection_string)
-    return BlobServiceClient.from_connection_string(connection_string)
+    return BlobServiceClient.from_connection_string(connection_string, **client_kwargs)
 
 
-def write_blob_to_container(df: pl.DataFrame, container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient) -> None:
+def write_blob_to_container(df: pl.DataFrame, container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient,
+                            write_profile: Optional[dict] = None) -> None:
     """
     Writes a Polars DataFrame as a Parquet file to an Azure Blob Storage container.
+    Files larger than one block are uploaded as blocks staged in parallel, then committed at once.
 
     :param df: Polars DataFrame to write
     :param container_name: Name of the Azure Blob Storage container
     :param path_to_blob: Path to the blob in the container
     :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param write_profile: Parquet and upload settings of the target layer, see from_polars_to_parquet
+    :raises Exception: If the upload fails
     """
-    parquet_buffer = from_polars_to_parquet(df)
+    write_profile = write_profile or {}
+    block_size = write_profile.get('block_size', DEFAULT_BLOCK_SIZE)
+
+    parquet_buffer = from_polars_to_parquet(df, write_profile)
+    if parquet_buffer.getbuffer().nbytes > block_size:
+        upload_file_in_blocks(parquet_buffer, container_name, path_to_blob, blob_service_client,
+                              block_size, write_profile.get('max_concurrency', 1))
+        return
+
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
     try:
-        blob_client.upload_blob(parquet_buffer.getvalue(), blob_type="BlockBlob", overwrite=True)
+        # Upload from the buffer itself, getvalue() would copy the whole file
+        blob_client.upload_blob(parquet_buffer, blob_type="BlockBlob", overwrite=True)
+        invalidate_listing_cache(container_name, path_to_blob)
         print(f"Successfully uploaded blob to {container_name}/{path_to_blob}")
     except Exception as e:
         print(f"Error uploading blob to {container_name}/{path_to_blob}: {e}")
+        raise
+
+
+def upload_file_in_blocks(file_obj: BinaryIO, container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient,
+                          block_size: int = DEFAULT_BLOCK_SIZE, max_concurrency: int = 1) -> None:
+    """
+    Uploads a file to an Azure Blob Storage container block by block, staging up to max_concurrency
+    blocks in parallel, so that at most that many blocks are held in memory at a time.
+    The blob is only replaced when the block list is committed.
+
+    :param file_obj: Binary file object positioned at the start of the content to upload
+    :param container_name: Name of the Azure Blob Storage container
+    :param path_to_blob: Path to the blob in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param block_size: Size in bytes of each staged block
+    :param max_concurrency: Maximum number of blocks staged at the same time
+    :raises Exception: If a block cannot be staged or the block list cannot be committed
+    """
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
+    try:
+        block_list = []
+        in_flight = []
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while True:
+                block = file_obj.read(block_size)
+                if not block:
+                    break
+                # Block ids must be base64 strings of the same length within a blob
+                block_id = base64.b64encode(f"{len(block_list):08d}".encode('utf-8')).decode('utf-8')
+                in_flight.append(executor.submit(blob_client.stage_block, block_id=block_id, data=block))
+                block_list.append(BlobBlock(block_id=block_id))
+
+                # Wait for the oldest block before reading more than max_concurrency blocks
+                if len(in_flight) >= max_concurrency:
+                    in_flight.pop(0).result()
+
+            for future in in_flight:
+                future.result()
+
+        # The committed list keeps the order in which the blocks were read
+        blob_client.commit_block_list(block_list)
+        invalidate_listing_cache(container_name, path_to_blob)
+        print(f"Successfully uploaded {len(block_list)} blocks to {container_name}/{path_to_blob}")
+    except Exception as e:
+        print(f"Error uploading blob to {container_name}/{path_to_blob}: {e}")
+        raise
+
+
+class LocalBlobCache:
+    """
+    Read-through cache of blob contents on local disk, shared by the processes of the host.
+
+    Every entry is a plain copy of a blob, named after the blob path and its ETag, so that it can
+    be memory-mapped by its readers. Entries are written to a temporary file and renamed, and are
+    only served while their ETag is the one of the blob properties. The least recently used entries
+    are evicted once the cache exceeds max_bytes.
+
+    An entry is pinned with a shared flock while a reader uses it, see open_path. Eviction takes an
+    exclusive flock without waiting, so the entries pinned by any process of the host are skipped,
+    including the one being returned and entries larger than max_bytes. Where flock is not available,
+    the cache is bypassed and every read is a download.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = BLOB_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get_entry_prefix(self, account_name: str, container_name: str, path_to_blob: str) -> str:
+        key = hashlib.sha256(f"{account_name}/{container_name}/{path_to_blob}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def get_entry_path(self, entry_prefix: str, etag: str) -> str:
+        return f"{entry_prefix}-{hashlib.sha256(etag.encode('utf-8')).hexdigest()[:16]}.blob"
+
+    def pin_entry(self, entry_path: str) -> Optional[BinaryIO]:
+        """
+        Opens an entry and takes a shared lock on it, the entry is pinned until the file is closed.
+
+        :param entry_path: Path of the entry
+        :return: The open file, None if the entry does not exist or was evicted before it was pinned
+        """
+        try:
+            file = open(entry_path, 'rb')
+        except FileNotFoundError:
+            return None
+        fcntl.flock(file.fileno(), fcntl.LOCK_SH)
+
+        # The entry may have been evicted between the open and the lock
+        try:
+            pinned = os.path.samestat(os.fstat(file.fileno()), os.stat(entry_path))
+        except FileNotFoundError:
+            pinned = False
+        if not pinned:
+            file.close()
+            return None
+        return file
+
+    def remove_entry(self, entry_path: str) -> bool:
+        """
+        Removes an entry unless a reader of any process has pinned it.
+
+        :param entry_path: Path of the entry
+        :return: True if the entry is gone, False if it is pinned
+        """
+        try:
+            file = open(entry_path, 'rb')
+        except FileNotFoundError:
+            return True
+        with file:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                if os.path.samestat(os.fstat(file.fileno()), os.stat(entry_path)):
+                    os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+        return True
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries that are not pinned until the cache fits in max_bytes.
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.blob'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                if self.remove_entry(path):
+                    total_size -= size
+
+    def download_entry(self, blob_client, entry_prefix: str, max_concurrency: int) -> Tuple[BinaryIO, str]:
+        """
+        Streams a blob to a new entry, the entry is pinned before it is renamed into the cache.
+
+        :param blob_client: BlobClient of the blob
+        :param entry_prefix: Prefix of the entries of the blob
+        :param max_concurrency: Number of parallel range requests used to download a large blob
+        :return: A tuple (open file of the pinned entry, path of the entry)
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        file = os.fdopen(fd, 'r+b')
+        try:
+            download_stream = blob_client.download_blob(max_concurrency=max_concurrency)
+            download_stream.readinto(file)
+            file.flush()
+            fcntl.flock(file.fileno(), fcntl.LOCK_SH)
+
+            # The ETag of the downloaded content may be newer than the one of the properties
+            entry_path = self.get_entry_path(entry_prefix, download_stream.properties.etag)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            file.close()
+            os.remove(tmp_path)
+            raise
+        return file, entry_path
+
+    @contextmanager
+    def open_path(self, container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient,
+                  max_concurrency: int = 1) -> Iterator[str]:
+        """
+        Yields the path of the local copy of a blob, downloading the blob if its ETag changed.
+        The download is streamed to disk, the content is never held in memory. The entry is pinned
+        until the block exits, the caller must open the path inside the block.
+
+        :param container_name: Name of the Azure Blob Storage container
+        :param path_to_blob: Path to the blob in the container
+        :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+        :param max_concurrency: Number of parallel range requests used to download a large blob
+        :return: Path to the local copy of the blob
+        """
+        blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
+
+        if fcntl is None:
+            # Entries cannot be pinned, the blob is streamed to a temporary file removed after the block
+            fd, tmp_path = tempfile.mkstemp(suffix='.blob')
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    blob_client.download_blob(max_concurrency=max_concurrency).readinto(file)
+                with self._lock:
+                    self.misses += 1
+                yield tmp_path
+            finally:
+                os.remove(tmp_path)
+            return
+
+        entry_prefix = self.get_entry_prefix(blob_service_client.account_name, container_name, path_to_blob)
+
+        entry_path = self.get_entry_path(entry_prefix, blob_client.get_blob_properties().etag)
+        file = self.pin_entry(entry_path)
+        if file is not None:
+            # Mark the entry as recently used
+            os.utime(entry_path)
+            with self._lock:
+                self.hits += 1
+        else:
+            file, entry_path = self.download_entry(blob_client, entry_prefix, max_concurrency)
+
+            # Previous versions of the blob cannot be served anymore, those still pinned are evicted later
+            for stale_path in glob.glob(f"{entry_prefix}-*.blob"):
+                if stale_path != entry_path:
+                    self.remove_entry(stale_path)
+
+            with self._lock:
+                self.misses += 1
+            self.evict()
+
+        with file:
+            yield entry_path
 
 
-def read_blob_from_container(container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient) -> Union[pl.DataFrame, None]:
+def get_blob_cache() -> LocalBlobCache:
+    """
+    Returns the blob cache of the process, created on first use in the BLOB_CACHE_DIR directory
+    (a folder of the temporary directory by default) and bounded by BLOB_CACHE_MAX_BYTES.
+
+    :return: The LocalBlobCache object
+    """
+    global _blob_cache
+    if _blob_cache is None:
+        directory = os.environ.get("BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "foot_sa_blob_cache"))
+        max_bytes = int(os.environ.get("BLOB_CACHE_MAX_BYTES", BLOB_CACHE_MAX_BYTES))
+        _blob_cache = LocalBlobCache(directory, max_bytes)
+    return _blob_cache
+
+
+def get_blob_cache_stats() -> Dict[str, int]:
+    """
+    Returns the number of reads served by the blob cache of the process and of reads that downloaded
+    the blob. The counters are cumulative for the process, zero until the cache is first used.
+
+    :return: Dictionary with 'blob_cache_hits' and 'blob_cache_misses'
+    """
+    if _blob_cache is None:
+        return {"blob_cache_hits": 0, "blob_cache_misses": 0}
+    with _blob_cache._lock:
+        return {"blob_cache_hits": _blob_cache.hits, "blob_cache_misses": _blob_cache.misses}
+
+
+class BlobRangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file object over a blob, every read is an HTTP range request.
+    Wrapped in a BufferedReader, it lets pyarrow fetch only the footer, row groups and
+    column chunks it needs.
+    """
+
+    def __init__(self, blob_client, size: int):
+        self.blob_client = blob_client
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = self.blob_client.download_blob(offset=self.position, length=length).readall()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def read_parquet_blob(container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient,
+                      columns: Optional[List[str]] = None, row_filters: Optional[List[Any]] = None,
+                      max_concurrency: int = 1) -> pl.DataFrame:
+    """
+    Reads a Parquet blob as a Polars DataFrame. With a column projection or row filters, a large blob
+    is read with range requests: only its footer and the column chunks of the matching row groups are
+    downloaded. Otherwise the blob is streamed to the local blob cache and memory-mapped from there,
+    without an intermediate copy in memory.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param path_to_blob: Path to the blob in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param columns: Columns to read, all columns if None
+    :param row_filters: Row filters in the pyarrow DNF format, e.g. [("publishedDate", ">=", date(2025, 1, 1))].
+                        Row groups are skipped using their statistics.
+    :param max_concurrency: Number of parallel range requests used to download a large blob
+    :return: Polars DataFrame read from the blob
+    """
+    if columns is None and row_filters is None:
+        with get_blob_cache().open_path(container_name, path_to_blob, blob_service_client, max_concurrency) as local_path:
+            return pl.read_parquet(local_path, memory_map=True)
+
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
+    size = blob_client.get_blob_properties().size
+
+    if size < RANGE_READ_MIN_BYTES:
+        # A few range requests would cost more than the download of a small blob
+        with get_blob_cache().open_path(container_name, path_to_blob, blob_service_client, max_concurrency) as local_path:
+            table = pq.read_table(local_path, columns=columns, filters=row_filters, memory_map=True)
+    else:
+        source = io.BufferedReader(BlobRangeFile(blob_client, size), buffer_size=256 * 1024)
+        table = pq.read_table(source, columns=columns, filters=row_filters, memory_map=True)
+
+    return pl.from_arrow(table)
+
+
+def read_blob_from_container(container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient,
+                             columns: Optional[List[str]] = None, row_filters: Optional[List[Any]] = None,
+                             raise_errors: bool = False) -> Union[pl.DataFrame, None]:
     """
     Reads a Parquet file from an Azure Blob Storage container and returns it as a Polars DataFrame.
 
     :param container_name: Name of the Azure Blob Storage container
     :param path_to_blob: Path to the blob in the container
     :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param columns: Columns to read, all columns if None
+    :param row_filters: Row filters in the pyarrow DNF format, see read_parquet_blob
+    :param raise_errors: If True, only a missing blob returns None and any other error is raised,
+                         for the callers that must not mistake a failed read for a missing file
     :return: Polars DataFrame read from the blob, or None if the operation fails
     """
-    blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
     try:
-        download_stream = blob_client.download_blob()
-        blob_data = download_stream.readall()
-        df = pl.read_parquet(BytesIO(blob_data))
+        df = read_parquet_blob(container_name, path_to_blob, blob_service_client, columns, row_filters)
         print(f"Successfully read blob from {container_name}/{path_to_blob}")
         return df
+    except ResourceNotFoundError:
+        print(f"Blob {container_name}/{path_to_blob} not found")
+        return None
     except Exception as e:
         print(f"Error reading blob from {container_name}/{path_to_blob}: {e}")
+        if raise_errors:
+            raise
         return None
 
 
-def read_all_parquets_from_container(container_name: str, folder_name: str, blob_service_client: BlobServiceClient) -> Union[List[pl.DataFrame], None]:
+def write_json_to_container(data: dict, container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient) -> None:
+    """
+    Writes a dictionary as a JSON file to an Azure Blob Storage container.
+
+    :param data: Dictionary to write
+    :param container_name: Name of the Azure Blob Storage container
+    :param path_to_blob: Path to the blob in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :raises Exception: If the upload fails
+    """
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
+    try:
+        blob_client.upload_blob(json.dumps(data).encode('utf-8'), blob_type="BlockBlob", overwrite=True)
+        print(f"Successfully uploaded blob to {container_name}/{path_to_blob}")
+    except Exception as e:
+        print(f"Error uploading blob to {container_name}/{path_to_blob}: {e}")
+        raise
+
+
+def read_json_from_container(container_name: str, path_to_blob: str, blob_service_client: BlobServiceClient,
+                             raise_errors: bool = False) -> Union[dict, None]:
     """
-    Reads all Parquet files from an Azure Blob Storage container and returns them as a list of Polars DataFrames.
+    Reads a JSON file from an Azure Blob Storage container and returns it as a dictionary.
 
     :param container_name: Name of the Azure Blob Storage container
+    :param path_to_blob: Path to the blob in the container
     :param blob_service_client: BlobServiceClient object for Azure Blob Storage
-    :return: List of Polars DataFrames, or None if the operation fails
+    :param raise_errors: If True, only a missing blob returns None and any other error is raised,
+                         for the callers that must not mistake a failed read for a missing file
+    :return: Dictionary read from the blob, or None if the operation fails
     """
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=path_to_blob)
+    try:
+        blob_data = blob_client.download_blob().readall()
+        print(f"Successfully read blob from {container_name}/{path_to_blob}")
+        return json.loads(blob_data)
+    except ResourceNotFoundError:
+        print(f"Blob {container_name}/{path_to_blob} not found")
+        return None
+    except Exception as e:
+        print(f"Error reading blob from {container_name}/{path_to_blob}: {e}")
+        if raise_errors:
+            raise
+        return None
+
+
+def get_object_path(objects_folder: str, content_hash: str) -> str:
+    """
+    Returns the path of a content-addressed object, sharded on the first two characters of its hash.
+
+    :param objects_folder: Folder holding the objects in the container
+    :param content_hash: SHA-256 of the content
+    :return: Path to the object in the container
+    """
+    return f"{objects_folder}/{content_hash[:2]}/{content_hash}.html.gz"
+
+
+def write_html_objects(df: pl.DataFrame, container_name: str, objects_folder: str, blob_service_client: BlobServiceClient,
+                       max_workers: int = 8) -> int:
+    """
+    Stores each HTML body of the DataFrame once, gzipped, under its SHA-256. Bodies already
+    stored by a previous run are not uploaded again. The objects are checked and uploaded concurrently.
+
+    :param df: Polars DataFrame with '_hashedId' (SHA-256 of the HTML) and 'html' columns
+    :param container_name: Name of the Azure Blob Storage container
+    :param objects_folder: Folder holding the objects in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param max_workers: Maximum number of concurrent uploads
+    :return: The number of objects uploaded
+    """
+    def upload(content_hash: str, html: str) -> bool:
+        blob_client = blob_service_client.get_blob_client(container=container_name, blob=get_object_path(objects_folder, content_hash))
+        if blob_client.exists():
+            return False
+        blob_client.upload_blob(gzip.compress(html.encode('utf-8')), blob_type="BlockBlob", overwrite=True)
+        return True
+
+    rows = df.select(["_hashedId", "html"]).unique(subset="_hashedId")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        num_uploaded = sum(executor.map(upload, rows.get_column("_hashedId").to_list(), rows.get_column("html").to_list()))
+
+    print(f"Successfully uploaded {num_uploaded} new objects to {container_name}/{objects_folder}")
+    return num_uploaded
+
+
+def read_html_objects(content_hashes: List[str], container_name: str, objects_folder: str, blob_service_client: BlobServiceClient,
+                      max_workers: int = 8) -> pl.DataFrame:
+    """
+    Downloads content-addressed HTML bodies concurrently.
+
+    :param content_hashes: SHA-256 of the HTML bodies to download
+    :param container_name: Name of the Azure Blob Storage container
+    :param objects_folder: Folder holding the objects in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param max_workers: Maximum number of concurrent downloads
+    :return: Polars DataFrame with '_hashedId' and 'html' columns, 'html' is null for missing objects
+    """
+    def download(content_hash: str) -> Union[str, None]:
+        blob_client = blob_service_client.get_blob_client(container=container_name, blob=get_object_path(objects_folder, content_hash))
+        try:
+            return gzip.decompress(blob_client.download_blob().readall()).decode('utf-8')
+        except Exception as e:
+            print(f"Error reading object {content_hash} from {container_name}/{objects_folder}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        htmls = list(executor.map(download, content_hashes))
+
+    return pl.DataFrame({"_hashedId": content_hashes, "html": htmls}, schema={"_hashedId": pl.String, "html": pl.String})
+
+
+def invalidate_listing_cache(container_name: str, path_to_blob: str) -> None:
+    """
+    Drops the listing snapshots that may contain a blob, called after the blob is written.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param path_to_blob: Path to the written blob in the container
+    """
+    for key in list(_listing_cache):
+        _, cached_container, prefix = key
+        if cached_container == container_name and path_to_blob.startswith(prefix):
+            _listing_cache.pop(key, None)
+
+
+def get_month_prefixes(folder_name: str, start_date: Optional[date], end_date: Optional[date]) -> List[str]:
+    """
+    Returns the listing prefixes of the 'epl_news_YYYY_MM' blobs of every month between two dates.
+
+    :param folder_name: Folder (prefix) of the blobs
+    :param start_date: First date of the range, or None for no lower bound
+    :param end_date: Last date of the range, or None for no upper bound
+    :return: The prefixes to list, a single prefix covering the folder if the range is unbounded
+    """
+    if start_date is None or end_date is None:
+        return [folder_name]
+
+    prefixes = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        prefixes.append(f"{folder_name}/epl_news_{year:04d}_{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return prefixes
+
+
+def list_blobs_with_prefix(container_name: str, prefix: str, blob_service_client: BlobServiceClient,
+                           cache_ttl: float = LISTING_CACHE_TTL_SECONDS) -> List[dict]:
+    """
+    Lists the Parquet files whose name starts with a prefix, the prefix is applied by the storage service.
+    The listing is kept as a snapshot for cache_ttl seconds, writes made through this module invalidate it.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param prefix: Prefix of the blobs to list
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param cache_ttl: Lifetime in seconds of the listing snapshot, 0 disables the snapshot
+    :return: List of dictionaries with the 'name' and 'etag' of each Parquet file
+    """
+    key = (blob_service_client.account_name, container_name, prefix)
+    cached = _listing_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+        return cached[1]
+
     container_client = blob_service_client.get_container_client(container_name)
-    dataframes = []
-    
+    blobs = [
+        {"name": blob.name, "etag": blob.etag}
+        for blob in container_client.list_blobs(name_starts_with=prefix)
+        if blob.name.endswith('.parquet')  # Process only parquet files
+    ]
+
+    if cache_ttl > 0:
+        _listing_cache[key] = (time.monotonic(), blobs)
+    return blobs
+
+
+def list_parquet_blobs(container_name: str, folder_name: str, blob_service_client: BlobServiceClient,
+                       start_date: Optional[date] = None, end_date: Optional[date] = None,
+                       cache_ttl: float = LISTING_CACHE_TTL_SECONDS) -> List[dict]:
+    """
+    Lists the Parquet files of a folder of an Azure Blob Storage container with their ETag.
+    With date bounds, only the blobs named 'epl_news_YYYY_MM_DD' within the range are returned and
+    the listing is restricted server-side to the months of the range.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param folder_name: Folder (prefix) of the blobs to list
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param start_date: First date of the blobs to list (inclusive), or None
+    :param end_date: Last date of the blobs to list (inclusive), or None
+    :param cache_ttl: Lifetime in seconds of the listing snapshots, 0 disables them
+    :return: List of dictionaries with the 'name' and 'etag' of each Parquet file
+    """
+    if start_date is None and end_date is None:
+        return list_blobs_with_prefix(container_name, folder_name, blob_service_client, cache_ttl)
+
+    # An open upper bound is closed with tomorrow, the blob names use the Europe/Vienna date
+    prefixes = get_month_prefixes(folder_name, start_date, end_date or date.today() + timedelta(days=1))
+
+    blobs = []
+    for prefix in prefixes:
+        for blob in list_blobs_with_prefix(container_name, prefix, blob_service_client, cache_ttl):
+            blob_date = parse_blob_name_date(blob["name"])
+            if blob_date is None:
+                continue
+            if (start_date is None or blob_date >= start_date) and (end_date is None or blob_date <= end_date):
+                blobs.append(blob)
+
+    return blobs
+
+
+def read_parquets_from_container(container_name: str, blob_names: List[str], blob_service_client: BlobServiceClient,
+                                 max_workers: int = 8, max_concurrency: int = 2,
+                                 columns: Optional[List[str]] = None, row_filters: Optional[List[Any]] = None,
+                                 path_column: Optional[str] = None) -> Union[pl.DataFrame, None]:
+    """
+    Reads the given Parquet files from an Azure Blob Storage container concurrently and concatenates them
+    in the order of the blob names.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param blob_names: Paths to the Parquet files in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param max_workers: Maximum number of blobs downloaded at the same time
+    :param max_concurrency: Number of parallel range requests per blob, only used by large blobs
+    :param columns: Columns to read, all columns if None
+    :param row_filters: Row filters in the pyarrow DNF format, see read_parquet_blob
+    :param path_column: If given, name of a column added with the path of the file each row was read from
+    :return: Polars DataFrame, or None if there is no file or the operation fails
+    """
+    def read(blob_name: str) -> pl.DataFrame:
+        # Read the blob data into a Polars DataFrame
+        df = read_parquet_blob(container_name, blob_name, blob_service_client, columns, row_filters, max_concurrency)
+        print(f"Successfully read parquet file from {container_name}/{blob_name}")
+        if path_column is not None:
+            df = df.with_columns(pl.lit(blob_name, dtype=pl.String).alias(path_column))
+        return df
+
     try:
-        # List all blobs in the container
-        blob_list = container_client.list_blobs()
-        
-        # Iterate over the blobs and read Parquet files
-        for blob in blob_list:
-            if blob.name.endswith('.parquet') and blob.name.startswith(folder_name):  # Process only parquet files
-                blob_client = container_client.get_blob_client(blob.name)
-                download_stream = blob_client.download_blob()
-                blob_data = download_stream.readall()
-                
-                # Read the blob data into a Polars DataFrame
-                df = pl.read_parquet(BytesIO(blob_data))
-                dataframes.append(df)
-                print(f"Successfully read parquet file from {container_name}/{blob.name}")
-        
+        # executor.map yields the results in the order of the blob names
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            dataframes = list(executor.map(read, blob_names))
+
         if dataframes:
-            return pl.concat(dataframes, rechunk=True)
+            # Diagonal concatenation, files written with an older layout may miss some columns
+            return pl.concat(dataframes, how="diagonal_relaxed", rechunk=True)
         else:
             return None
-    
+
     except Exception as e:
         print(f"Error reading Parquet files from container {container_name}: {e}")
         return None
 
 
-def merge_dataframes_on_id(df1: pl.DataFrame, df2: pl.DataFrame, col_id: pl.String) -> pl.DataFrame:
+def download_blobs_to_directory(container_name: str, blob_names: List[str], directory: str, blob_service_client: BlobServiceClient,
+                                max_workers: int = 8, max_concurrency: int = 2) -> List[str]:
     """
-    Merges two Polars DataFrames based on the col_id column.
-    If an col_id from df1 exists in df2, it will not be added.
+    Downloads blobs concurrently to files of a local directory, so that they can be scanned lazily by Polars.
 
-    :param df1: First Polars DataFrame
-    :param df2: Second Polars DataFrame
-    :return: Merged Polars DataFrame with no duplicate col_id records from df1
+    :param container_name: Name of the Azure Blob Storage container
+    :param blob_names: Paths to the blobs in the container
+    :param directory: Local directory receiving the files
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param max_workers: Maximum number of blobs downloaded at the same time
+    :param max_concurrency: Number of parallel range requests per blob, only used by large blobs
+    :return: The local paths of the downloaded files, in the same order as the blob names
     """
-    try:
-        # Perform an anti-join to find records in df1 that do not have a match in df2 based on col_id
-        df_filtered = df1.join(df2, on=col_id, how="anti")
+    container_client = blob_service_client.get_container_client(container_name)
 
-        # Log the result of the anti-join operation
-        if df_filtered.is_empty():
-            print("No new records to merge.")
-        else:
-            print(f"{df_filtered.shape[0]} new records found. Merging them.")
+    def download(index: int, blob_name: str) -> str:
+        # Prefix with the index so that blobs with the same base name do not collide
+        local_path = os.path.join(directory, f"{index:06d}_{os.path.basename(blob_name)}")
+        with open(local_path, 'wb') as file:
+            container_client.get_blob_client(blob_name).download_blob(max_concurrency=max_concurrency).readinto(file)
+        print(f"Successfully downloaded {container_name}/{blob_name}")
+        return local_path
 
-        # Concatenate the filtered rows from df1 with df2
-        df_merged = pl.concat([df2, df_filtered], how="vertical")
-        return df_merged
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(download, range(len(blob_names)), blob_names))
 
-    except Exception as e:
-        print(f"Error occurred while merging dataframes: {e}")
-        raise
+
+def get_partition_path(table_folder: str, partition: Dict[str, str], file_name: str = "part.parquet") -> str:
+    """
+    Returns the path of a Parquet file of a Hive-style partition (key=value folders).
+
+    :param table_folder: Folder of the partitioned table in the container
+    :param partition: Ordered mapping of the partition keys to their values
+    :param file_name: Name of the file in the partition folder
+    :return: Path to the partition file in the container
+    """
+    # Values are URL-encoded, team names may hold spaces or slashes
+    folders = [f"{key}={quote(str(value), safe='')}" for key, value in partition.items()]
+    return "/".join([table_folder, *folders, file_name])
+
+
+def parse_partition_path(table_folder: str, path_to_blob: str) -> Dict[str, str]:
+    """
+    Returns the partition keys and values encoded in the path of a partition file.
+
+    :param table_folder: Folder of the partitioned table in the container
+    :param path_to_blob: Path to the partition file in the container
+    :return: Mapping of the partition keys to their values
+    """
+    folders = path_to_blob[len(table_folder):].strip("/").split("/")[:-1]
+    return {
+        key: unquote(value)
+        for key, value in (folder.split("=", 1) for folder in folders if "=" in folder)
+    }
+
+
+def partition_matches(partition: Dict[str, str], filters: Optional[Dict[str, Union[Callable[[str], bool], Collection[str]]]]) -> bool:
+    """
+    Tells whether the values of a partition are accepted by partition filters.
+
+    :param partition: Mapping of the partition keys to their values
+    :param filters: Mapping of partition keys to either a predicate on the value or a collection of accepted values
+    :return: True if every filter accepts the value of its key
+    """
+    for key, accepted in (filters or {}).items():
+        value = partition.get(key)
+        if value is None or not (accepted(value) if callable(accepted) else value in accepted):
+            return False
+    return True
+
+
+def list_partitions(container_name: str, table_folder: str, blob_service_client: BlobServiceClient,
+                    filters: Optional[Dict[str, Union[Callable[[str], bool], Collection[str]]]] = None) -> List[dict]:
+    """
+    Lists the partition files of a Hive-partitioned table, keeping only the partitions matching the filters.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the partitioned table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param filters: Mapping of partition keys to either a predicate on the value or a collection of accepted values.
+                    ISO dates compare as strings, e.g. {"published_date": lambda d: d >= "2025-01-01"}
+    :return: List of dictionaries with the 'name', 'etag' and 'partition' of each partition file
+    """
+    partitions = []
+
+    for blob in list_parquet_blobs(container_name, f"{table_folder}/", blob_service_client):
+        partition = parse_partition_path(table_folder, blob["name"])
+        if partition_matches(partition, filters):
+            partitions.append({**blob, "partition": partition})
+
+    return partitions
+
+
+def delete_blobs_from_container(container_name: str, blob_names: List[str], blob_service_client: BlobServiceClient) -> int:
+    """
+    Deletes blobs from an Azure Blob Storage container, blobs that do not exist anymore are skipped.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param blob_names: Paths to the blobs in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The number of blobs deleted
+    """
+    container_client = blob_service_client.get_container_client(container_name)
+    num_deleted = 0
+
+    for blob_name in blob_names:
+        try:
+            container_client.delete_blob(blob_name)
+            invalidate_listing_cache(container_name, blob_name)
+            num_deleted += 1
+        except ResourceNotFoundError:
+            pass
+
+    print(f"Successfully deleted {num_deleted} blobs from {container_name}")
+    return num_deleted
+
+
+def get_parquet_writer_options(write_profile: Optional[dict]) -> dict:
+    """
+    Returns the pyarrow Parquet writer options of a write profile.
+
+    :param write_profile: Write profile of a layer, with optional 'compression', 'compression_level',
+                          'use_dictionary' and 'write_statistics' keys
+    :return: Keyword arguments for pyarrow.parquet.ParquetWriter and pyarrow.parquet.write_table
+    """
+    write_profile = write_profile or {}
+    return {
+        "compression": write_profile.get('compression', 'snappy'),
+        "compression_level": write_profile.get('compression_level'),
+        "use_dictionary": write_profile.get('use_dictionary', True),
+        "write_statistics": write_profile.get('write_statistics', True)
+    }
 
 
-def from_polars_to_parquet(df: pl.DataFrame) -> BytesIO:
+def from_polars_to_parquet(df: pl.DataFrame, write_profile: Optional[dict] = None) -> BytesIO:
     """
     Converts a Polars DataFrame to a Parquet file in memory.
 
     :param df: Polars DataFrame to be converted to Parquet
+    :param write_profile: Write profile of the target layer: 'compression', 'compression_level',
+                          'row_group_size', 'use_dictionary' and 'write_statistics'. The pyarrow
+                          defaults are used when None
     :return: BytesIO buffer containing the Parquet file
     """
     parquet_buffer = BytesIO()
-    df.write_parquet(parquet_buffer, use_pyarrow=True)
+    if write_profile is None:
+        df.write_parquet(parquet_buffer, use_pyarrow=True)
+    else:
+        pq.write_table(
+            df.to_arrow(),
+            parquet_buffer,
+            row_group_size=write_profile.get('row_group_size'),
+            **get_parquet_writer_options(write_profile)
+        )
     parquet_buffer.seek(0)  # Reset buffer position to the beginning
     return parquet_buffer
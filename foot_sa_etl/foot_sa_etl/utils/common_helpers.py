@@ -1,6 +1,12 @@
+import os
+import re
 import hashlib
 import pytz  # To manage time zones
-from datetime import datetime
+import polars as pl
+import pyarrow as pa
+from datetime import date, datetime
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from textblob import TextBlob
 
 
@@ -29,6 +35,69 @@ def generate_hash(content: str) -> str:
         raise
 
 
+# hashlib releases the GIL for inputs of at least 2 KiB, shorter strings are hashed faster by one thread
+PARALLEL_HASH_MIN_BYTES = 2048
+
+
+def hash_series(series: pl.Series, length: Optional[int] = None, n_threads: Optional[int] = None,
+                chunk_size: int = 256) -> pl.Series:
+    """
+    Generates the SHA-256 hash of every string of a Series in one call, instead of one Python
+    callback per row with map_elements. The strings are hashed straight from the Arrow buffer of
+    the Series, no Python string is created or encoded per row. Series whose strings average at
+    least PARALLEL_HASH_MIN_BYTES, such as HTML bodies, are hashed in chunks by a thread pool when
+    the host has several CPUs, shorter strings such as ids are hashed serially.
+    The hashes are identical to generate_hash, existing ids do not need any migration.
+
+    :param series: Polars Series of strings to hash, null values stay null
+    :param length: Optional number of characters to keep from the start of each hash
+    :param n_threads: Number of threads, defaults to the number of CPUs
+    :param chunk_size: Number of rows hashed by a thread at a time
+    :return: A Polars Series of hexadecimal hashes with the same name as the input
+    """
+    # One contiguous UTF-8 buffer and its 64-bit offsets
+    array = series.cast(pl.String).to_arrow()
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if array.type != pa.large_string():
+        array = array.cast(pa.large_string())
+    _, offsets_buffer, data_buffer = array.buffers()
+    offsets = memoryview(offsets_buffer).cast('q')[array.offset:array.offset + len(array) + 1].tolist()
+    data = memoryview(data_buffer) if data_buffer is not None else memoryview(b'')
+    is_null = array.is_null().to_pylist() if array.null_count else None
+    sha256 = hashlib.sha256
+
+    def hash_rows(start: int, stop: int) -> List[Optional[str]]:
+        hashes = [sha256(data[offsets[i]:offsets[i + 1]]).hexdigest()[:length] for i in range(start, stop)]
+        if is_null is not None:
+            hashes = [None if is_null[i] else value for i, value in zip(range(start, stop), hashes)]
+        return hashes
+
+    n_threads = n_threads or os.cpu_count() or 1
+    average_bytes = (offsets[-1] - offsets[0]) / max(len(offsets) - 1, 1)
+    if n_threads == 1 or average_bytes < PARALLEL_HASH_MIN_BYTES or len(array) <= chunk_size:
+        hashes = hash_rows(0, len(array))
+    else:
+        starts = range(0, len(array), chunk_size)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            hashed_chunks = executor.map(lambda start: hash_rows(start, min(start + chunk_size, len(array))), starts)
+            hashes = [value for hashed_chunk in hashed_chunks for value in hashed_chunk]
+
+    return pl.Series(series.name, hashes, dtype=pl.String)
+
+
+def create_title_key(team_name: str, title: str) -> str:
+    """
+    Creates the key identifying an article title of a team, used to know which articles
+    have already been scraped. It is the first 16 characters of the SHA-256 of team and title.
+
+    :param team_name: Name of the team
+    :param title: Title of the article
+    :return: A 16 characters hexadecimal key
+    """
+    return generate_hash(f"{team_name}{title}")[:16]
+
+
 def create_blob_name(timestamp: str) -> str:
     """
     Creates a blob name in the format 'epl_news_YYYY_MM_DD' based on the given timestamp string.
@@ -46,6 +115,19 @@ def create_blob_name(timestamp: str) -> str:
     return f"epl_news_{formatted_date}"
 
 
+def parse_blob_name_date(blob_name: str) -> Optional[date]:
+    """
+    Returns the date encoded in a blob name created by create_blob_name.
+
+    :param blob_name: Blob name or path, e.g. 'epl_news/epl_news_2024_10_03.parquet'
+    :return: The date of the blob, or None if the name does not follow the 'epl_news_YYYY_MM_DD' format
+    """
+    match = re.search(r'epl_news_(\d{4})_(\d{2})_(\d{2})', blob_name)
+    if match is None:
+        return None
+    return date(*map(int, match.groups()))
+
+
 def get_sentiment(polarity: float, threshold: float) -> str:
     """
     Determines the sentiment based on the polarity value and a threshold.
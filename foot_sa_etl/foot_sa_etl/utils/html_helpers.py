@@ -0,0 +1,396 @@
+import os
+import re
+from functools import partial
+from importlib.metadata import version, PackageNotFoundError
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+import polars as pl
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is only needed by the 'lxml' extraction engine
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+
+# Class of the span wrapping the headline of every article on a BBC team page
+HEADLINE_CLASS = 'ssrcss-189b1h2-HeadlineWrap'
+
+# Class of the paragraphs holding the text of an article
+PARAGRAPH_CLASS = 'ssrcss-1q0x1qg-Paragraph e1jhz7w10'
+
+# Polars type of the fields of an article returned by the extraction engines
+ARTICLE_FIELDS_DTYPE = pl.Struct([
+    pl.Field("publishedDate", pl.Utf8),
+    pl.Field("title", pl.Utf8),
+    pl.Field("content", pl.Utf8)
+])
+
+# Polars type of the articles of a page
+PAGE_ARTICLES_DTYPE = pl.List(ARTICLE_FIELDS_DTYPE)
+
+# XPath equivalents of the BeautifulSoup lookups, a single class matches any token of the
+# class attribute while a class containing a space matches the whole attribute
+HEADLINE_XPATH = f"//span[contains(concat(' ', normalize-space(@class), ' '), ' {HEADLINE_CLASS} ')]"
+PARAGRAPH_XPATH = f".//p[@class='{PARAGRAPH_CLASS}']"
+
+
+# Tags whose start closes an open paragraph in libxml2, html.parser nests them in the paragraph instead
+PARAGRAPH_CLOSING_TAGS = (
+    "p", "address", "article", "aside", "blockquote", "center", "details", "dialog", "dir", "div", "dl",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hgroup", "hr", "listing", "main", "menu", "nav", "ol", "pre", "section", "table", "ul", "xmp"
+)
+
+# Start tags of PARAGRAPH_CLOSING_TAGS and end tags of paragraphs, with their self-closing slash. Comments,
+# scripts and styles are matched first and skipped: html.parser does not read tags in their raw text
+PARAGRAPH_TAG_PATTERN = re.compile(
+    r"<!--[^-]*(?:-(?!->)[^-]*)*-->"
+    r"|<script\b[^<]*(?:<(?!/script)[^<]*)*</script\s*>|<style\b[^<]*(?:<(?!/style)[^<]*)*</style\s*>"
+    r"|<(/?)(" + "|".join(PARAGRAPH_CLOSING_TAGS) + r")(?=[\s/>])(?:[^>\"']|\"[^\"]*\"|'[^']*')*?(/?)>",
+    re.IGNORECASE
+)
+
+
+def has_unclosed_paragraphs(html: str) -> bool:
+    """
+    Tells whether a page holds a paragraph that libxml2 closes earlier than html.parser: a paragraph
+    left open when the next paragraph or a block starts, or written as <p/>. html.parser nests the
+    following content in the paragraph, so its text differs between the lxml and bs4 engines.
+
+    :param html: The HTML content as a string
+    :return: True if a paragraph is not closed by its own end tag before the next block
+    """
+    is_paragraph_open = False
+    for match in PARAGRAPH_TAG_PATTERN.finditer(html):
+        is_end, tag, self_closing = match.group(1), match.group(2), match.group(3)
+        if tag is None:
+            continue
+        tag = tag.lower()
+        if is_end:
+            if tag == "p":
+                is_paragraph_open = False
+            continue
+        if is_paragraph_open or (tag == "p" and self_closing):
+            return True
+        is_paragraph_open = tag == "p"
+    return is_paragraph_open
+
+
+def has_headline_class(class_value) -> bool:
+    """
+    Tells whether a class attribute contains the headline class. The attribute is still a raw
+    string when SoupStrainer filters the tags, hence the explicit split.
+
+    :param class_value: The class attribute, as a string or a list of classes
+    :return: True if the headline class is one of the classes
+    """
+    if not class_value:
+        return False
+    classes = class_value.split() if isinstance(class_value, str) else class_value
+    return HEADLINE_CLASS in classes
+
+
+def extract_headline_titles(html: str) -> List[str]:
+    """
+    Extracts the title of every article listed on a BBC team page. Only the headline spans
+    are parsed, which makes it much cheaper than building the whole tree of the page.
+
+    :param html: The HTML content as a string
+    :return: The list of article titles found on the page, in page order
+    """
+    headlines = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('span', class_=has_headline_class))
+
+    titles = []
+    for headline in headlines.find_all('span', class_=HEADLINE_CLASS):
+        # The title is held by the first span nested in the headline
+        title_span = headline.find('span')
+        if title_span:
+            titles.append(title_span.get_text())
+
+    return titles
+
+
+class ArticleFragmentParser(HTMLParser):
+    """
+    Streaming tokenizer keeping the raw markup of the nodes read by the silver layer: every
+    <article> element, plus the headline spans that are not nested in an article. The rest of
+    the page (scripts, styles, navigation...) is dropped without building any tree.
+    """
+
+    def __init__(self):
+        # Character references are kept as they are, to reproduce the original markup
+        super().__init__(convert_charrefs=False)
+        self.fragments: List[str] = []
+        self._current: List[str] = []
+        self._capture_tag = None
+        self._open_count = 0
+
+    def _is_capture_start(self, tag: str, attrs) -> bool:
+        if tag == 'article':
+            return True
+        return tag == 'span' and any(name == 'class' and value and HEADLINE_CLASS in value.split()
+                                     for name, value in attrs)
+
+    def handle_starttag(self, tag, attrs):
+        if self._capture_tag is None and self._is_capture_start(tag, attrs):
+            self._capture_tag = tag
+        if self._capture_tag is None:
+            return
+        if tag == self._capture_tag:
+            self._open_count += 1
+        self._current.append(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        if self._capture_tag is not None:
+            self._current.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self._capture_tag is None:
+            return
+        self._current.append(f"</{tag}>")
+        if tag == self._capture_tag:
+            self._open_count -= 1
+            if self._open_count == 0:
+                self.fragments.append(''.join(self._current))
+                self._current = []
+                self._capture_tag = None
+
+    def handle_data(self, data):
+        if self._capture_tag is not None:
+            self._current.append(data)
+
+    def handle_entityref(self, name):
+        if self._capture_tag is not None:
+            self._current.append(f"&{name};")
+
+    def handle_charref(self, name):
+        if self._capture_tag is not None:
+            self._current.append(f"&#{name};")
+
+
+def trim_to_articles(html: str) -> str:
+    """
+    Trims a BBC team page to the article nodes read by the silver layer.
+
+    :param html: The HTML content as a string
+    :return: A small HTML document holding the article fragments, or the input unchanged
+             if no article is found (error messages for instance)
+    """
+    parser = ArticleFragmentParser()
+    parser.feed(html)
+    parser.close()
+
+    # An article left open at the end of the page (truncated page) is kept as html.parser reads it
+    if parser._current:
+        parser.fragments.append(''.join(parser._current))
+
+    if not parser.fragments:
+        return html
+
+    return "<html><body>" + "\n".join(parser.fragments) + "</body></html>"
+
+
+def extract_fields_with_bs4(html: str) -> List[dict]:
+    """
+    Extracts 'publishedDate', 'title', and 'content' of every article of the given HTML string
+    with BeautifulSoup.
+
+    :param html: The HTML content as a string
+    :return: A list of dictionaries containing publishedDate, title and content, one per article
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    extracted_articles = []
+
+    # Find all articles based on the class
+    for article in soup.find_all('span', class_=HEADLINE_CLASS):
+        # Extract title
+        title = article.find('span').get_text() if article.find('span') else "No title found"
+
+        # Extract published date
+        published_date = "No date found"
+        timestamp = article.find('span', {'data-testid': 'timestamp'})
+        if timestamp:
+            accessible_timestamp = timestamp.find('span', {'data-testid': 'accessible-timestamp'})
+            if accessible_timestamp:
+                published_date = accessible_timestamp.get_text()
+
+        # Extract all paragraphs related to the article
+        text_content = []
+        parent_article = article.find_parent('article')
+        if parent_article:
+            paragraphs = parent_article.find_all('p', class_=PARAGRAPH_CLASS)
+            text_content = [p.get_text() for p in paragraphs]
+
+        full_text = ' '.join(text_content) if text_content else "No content found"
+
+        # Dictionaries are converted to Structs by Polars
+        extracted_articles.append({
+            "publishedDate": published_date,
+            "title": title,
+            "content": full_text
+        })
+
+    return extracted_articles
+
+
+def extract_fields_with_lxml(html: str) -> List[dict]:
+    """
+    Extracts 'publishedDate', 'title', and 'content' of every article of the given HTML string
+    with lxml. The lookups mirror extract_fields_with_bs4 and return the same dictionaries, but
+    the page is parsed by libxml2 instead of the pure-Python html.parser. The two parsers only
+    build different trees around paragraphs left open, such pages are extracted with bs4.
+
+    :param html: The HTML content as a string
+    :return: A list of dictionaries containing publishedDate, title and content, one per article
+    """
+    if lxml_html is None:
+        raise ImportError("The 'lxml' extraction engine requires the lxml package.")
+
+    if has_unclosed_paragraphs(html):
+        return extract_fields_with_bs4(html)
+
+    try:
+        tree = lxml_html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        # Empty documents cannot be parsed
+        return []
+
+    extracted_articles = []
+
+    for article in tree.xpath(HEADLINE_XPATH):
+        # Extract title, held by the first nested span
+        spans = article.xpath('.//span')
+        title = spans[0].text_content() if spans else "No title found"
+
+        # Extract published date
+        timestamps = article.xpath(".//span[@data-testid='timestamp']")
+        accessible_timestamps = timestamps[0].xpath(".//span[@data-testid='accessible-timestamp']") if timestamps else []
+        published_date = accessible_timestamps[0].text_content() if accessible_timestamps else "No date found"
+
+        # Extract all paragraphs related to the article
+        text_content = []
+        parent_article = next(article.iterancestors('article'), None)
+        if parent_article is not None:
+            text_content = [p.text_content() for p in parent_article.xpath(PARAGRAPH_XPATH)]
+
+        full_text = ' '.join(text_content) if text_content else "No content found"
+
+        extracted_articles.append({
+            "publishedDate": published_date,
+            "title": title,
+            "content": full_text
+        })
+
+    return extracted_articles
+
+
+# Extraction engines selectable with the 'extraction_engine' entry of the config
+EXTRACTION_ENGINES: Dict[str, Callable[[str], List[dict]]] = {
+    "bs4": extract_fields_with_bs4,
+    "lxml": extract_fields_with_lxml,
+}
+
+
+# Distribution of the parser of every extraction engine, its version is part of the engine version
+EXTRACTION_ENGINE_PACKAGES: Dict[str, str] = {
+    "bs4": "beautifulsoup4",
+    "lxml": "lxml",
+}
+
+
+def get_extraction_engine_version(name: str) -> str:
+    """
+    Returns the name of an extraction engine and the version of its parser, e.g. 'bs4 4.12.3'.
+    Results extracted by another engine or parser version must not be reused.
+
+    :param name: Name of the engine, one of EXTRACTION_ENGINES
+    :return: The engine name followed by the parser version
+    """
+    get_extraction_engine(name)
+    try:
+        package_version = version(EXTRACTION_ENGINE_PACKAGES[name])
+    except PackageNotFoundError:
+        package_version = "unknown"
+    return f"{name} {package_version}"
+
+
+def get_extraction_engine(name: str) -> Callable[[str], List[dict]]:
+    """
+    Returns the extraction function registered under the given name.
+
+    :param name: Name of the engine, one of EXTRACTION_ENGINES
+    :return: A function taking an HTML string and returning the fields of its articles
+    """
+    if name not in EXTRACTION_ENGINES:
+        raise ValueError(f"Unknown extraction engine '{name}', expected one of {list(EXTRACTION_ENGINES)}")
+    return EXTRACTION_ENGINES[name]
+
+
+def compare_extraction_engines(htmls: List[str], reference: str = "bs4", candidate: str = "lxml") -> List[int]:
+    """
+    Runs two extraction engines over recorded pages (e.g. the html column of a bronze file)
+    and returns the pages on which their outputs differ, to check an engine before enabling it.
+
+    :param htmls: List of HTML strings
+    :param reference: Name of the reference engine
+    :param candidate: Name of the engine to check
+    :return: The indexes of the pages whose extracted fields differ
+    """
+    reference_engine = get_extraction_engine(reference)
+    candidate_engine = get_extraction_engine(candidate)
+
+    mismatches = []
+    for index, html in enumerate(htmls):
+        if reference_engine(html) != candidate_engine(html):
+            mismatches.append(index)
+
+    return mismatches
+
+
+def extract_fields_batch(htmls: List[str], engine: str) -> List[List[dict]]:
+    """
+    Runs an extraction engine over a chunk of pages. It is the unit of work sent to the worker
+    processes: only the HTML strings and the extracted fields cross the process boundary.
+
+    :param htmls: List of HTML strings
+    :param engine: Name of the extraction engine
+    :return: The articles extracted from every page, in the same order as the pages
+    """
+    extract = get_extraction_engine(engine)
+    return [extract(html) for html in htmls]
+
+
+def extract_fields_series(htmls: pl.Series, engine: str, workers: int = 1, chunk_size: int = 64,
+                          executor: Optional[ProcessPoolExecutor] = None) -> pl.Series:
+    """
+    Extracts the fields of every page of a Series, either serially or sharded across a process pool.
+    The chunks are mapped in order, so the output rows line up with the input rows.
+
+    :param htmls: Polars Series of HTML strings
+    :param engine: Name of the extraction engine
+    :param workers: Number of worker processes, 1 to parse in the current process, 0 for one per CPU
+    :param chunk_size: Number of pages sent to a worker at a time
+    :param executor: Optional process pool to reuse instead of starting a new one
+    :return: A Polars Series holding, for every page, the list of its articles as structs
+    """
+    values = htmls.to_list()
+    workers = workers or os.cpu_count()
+
+    if executor is None and (workers <= 1 or len(values) <= chunk_size):
+        extracted = extract_fields_batch(values, engine)
+    else:
+        chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+        extract_chunk = partial(extract_fields_batch, engine=engine)
+        if executor is None:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                extracted_chunks = list(pool.map(extract_chunk, chunks))
+        else:
+            extracted_chunks = list(executor.map(extract_chunk, chunks))
+        extracted = [fields for chunk in extracted_chunks for fields in chunk]
+
+    return pl.Series(htmls.name, extracted, dtype=PAGE_ARTICLES_DTYPE)
@@ -0,0 +1,352 @@
+import math
+import uuid
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+import polars as pl
+from azure.storage.blob import BlobServiceClient
+
+from utils.azure_blob_utils import (
+    write_blob_to_container,
+    read_blob_from_container,
+    write_json_to_container,
+    read_json_from_container,
+    read_parquets_from_container,
+    delete_blobs_from_container
+)
+
+
+# Key index of a table, kept next to its data:
+#
+# {table_folder}/_index/index.json              parameters, segments and counters of the index
+# {table_folder}/_index/bloom-*.parquet         bits of the Bloom filter, answers "surely new" for most keys
+# {table_folder}/_index/keys-*.parquet          sorted key segments, confirm the keys the filter may contain
+#
+# The index is valid for a table as long as it has indexed as many rows as the table parts hold,
+# otherwise it is rebuilt from the key column of the parts.
+INDEX_FOLDER = "_index"
+
+
+class BloomFilter:
+    """
+    Bloom filter over string keys. Every key sets `num_hashes` bits derived by double hashing
+    from its BLAKE2b digest, so that the bits are stable across processes and library versions.
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Optional[np.ndarray] = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else np.zeros((num_bits + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def from_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """
+        Creates an empty filter sized for `capacity` keys at the given false positive rate.
+        """
+        num_bits = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def positions(self, keys: pl.Series) -> np.ndarray:
+        """
+        Returns the bit positions of the keys, one row of `num_hashes` positions per key.
+
+        :raises ValueError: If a key is null
+        """
+        if keys.null_count() > 0:
+            raise ValueError(f"The Bloom filter cannot hash null keys, {keys.null_count()} found.")
+        digests = b"".join(hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest() for key in keys.to_list())
+        hashes = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        # Unsigned overflow is the intended wrap-around of double hashing
+        with np.errstate(over='ignore'):
+            return (hashes[:, :1] + steps * hashes[:, 1:]) % np.uint64(self.num_bits)
+
+    def add(self, keys: pl.Series) -> None:
+        """
+        Sets the bits of the keys.
+        """
+        if keys.is_empty():
+            return
+        positions = self.positions(keys).ravel()
+        np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.int64), (1 << (positions & np.uint64(7))).astype(np.uint8))
+
+    def might_contain(self, keys: pl.Series) -> np.ndarray:
+        """
+        Returns, for every key, False if the key was never added and True if it may have been.
+        """
+        if keys.is_empty():
+            return np.zeros(0, dtype=bool)
+        positions = self.positions(keys)
+        bits = (self.bits[(positions >> np.uint64(3)).astype(np.int64)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+
+def get_index_path(table_folder: str, file_name: str) -> str:
+    """
+    Returns the path of a file of the key index of a table.
+
+    :param table_folder: Folder of the table in the container
+    :param file_name: Name of the file in the index folder
+    :return: Path to the file in the container
+    """
+    return f"{table_folder}/{INDEX_FOLDER}/{file_name}"
+
+
+def count_table_rows(manifest: dict) -> int:
+    """
+    Returns the number of rows of the parts of a table manifest.
+    """
+    return sum(part["num_rows"] for part in manifest["parts"])
+
+
+def write_key_segments(keys: pl.Series, container_name: str, table_folder: str, blob_service_client: BlobServiceClient,
+                       segment_rows: int) -> List[dict]:
+    """
+    Writes sorted keys as segments of at most `segment_rows` keys.
+
+    :param keys: Keys to write
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param segment_rows: Maximum number of keys per segment
+    :return: The descriptions of the segments, with their 'path', 'num_keys', 'key_min' and 'key_max'
+    """
+    keys = keys.sort()
+    segments = []
+    for offset in range(0, len(keys), segment_rows):
+        df_segment = keys.slice(offset, segment_rows).to_frame("key")
+        path = get_index_path(table_folder, f"keys-{uuid.uuid4().hex}.parquet")
+        write_blob_to_container(df_segment, container_name, path, blob_service_client)
+        segments.append({
+            "path": path,
+            "num_keys": len(df_segment),
+            "key_min": df_segment.get_column("key").min(),
+            "key_max": df_segment.get_column("key").max()
+        })
+    return segments
+
+
+def save_key_index(index: dict, container_name: str, table_folder: str, blob_service_client: BlobServiceClient) -> None:
+    """
+    Writes the Bloom filter of an index, then its description. The description is written last,
+    it only refers to files that exist.
+
+    :param index: Key index, as returned by load_key_index
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    """
+    bloom: BloomFilter = index["bloom"]
+    bloom_path = get_index_path(table_folder, f"bloom-{uuid.uuid4().hex}.parquet")
+    write_blob_to_container(pl.DataFrame({"bits": [bloom.bits.tobytes()]}, schema={"bits": pl.Binary}), container_name, bloom_path, blob_service_client)
+
+    previous_bloom_path = index.get("bloom_path")
+    index["bloom_path"] = bloom_path
+    description = {name: value for name, value in index.items() if name != "bloom"}
+    description.update({"num_bits": bloom.num_bits, "num_hashes": bloom.num_hashes})
+    write_json_to_container(description, container_name, get_index_path(table_folder, "index.json"), blob_service_client)
+
+    if previous_bloom_path is not None:
+        delete_blobs_from_container(container_name, [previous_bloom_path], blob_service_client)
+
+
+def load_key_index(container_name: str, table_folder: str, blob_service_client: BlobServiceClient) -> Optional[dict]:
+    """
+    Loads the key index of a table.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The index, with its BloomFilter under 'bloom', or None if the table has no index
+    """
+    description = read_json_from_container(container_name, get_index_path(table_folder, "index.json"), blob_service_client, raise_errors=True)
+    if description is None:
+        return None
+
+    df_bloom = read_blob_from_container(container_name, description["bloom_path"], blob_service_client)
+    if df_bloom is None:
+        return None
+
+    bits = np.frombuffer(df_bloom.get_column("bits")[0], dtype=np.uint8).copy()
+    return {**description, "bloom": BloomFilter(description["num_bits"], description["num_hashes"], bits)}
+
+
+def build_key_index(container_name: str, table_folder: str, key: str, manifest: dict, blob_service_client: BlobServiceClient,
+                    false_positive_rate: float = 0.01, min_capacity: int = 100000, segment_rows: int = 1000000) -> dict:
+    """
+    Builds the key index of a table from the key column of its parts. The filter is sized for twice
+    the current number of keys, it is rebuilt larger once it holds more keys than its capacity.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param key: Key column of the table
+    :param manifest: Current manifest of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param false_positive_rate: Target false positive rate of the Bloom filter at full capacity
+    :param min_capacity: Minimum number of keys the Bloom filter is sized for
+    :param segment_rows: Maximum number of keys per key segment
+    :return: The new index, already saved
+    """
+    previous = read_json_from_container(container_name, get_index_path(table_folder, "index.json"), blob_service_client, raise_errors=True)
+
+    keys = pl.Series("key", [], dtype=pl.String)
+    if manifest["parts"]:
+        df_keys = read_parquets_from_container(container_name, [part["path"] for part in manifest["parts"]], blob_service_client, columns=[key])
+        if df_keys is None:
+            raise RuntimeError(f"Could not read the keys of {container_name}/{table_folder}")
+        keys = df_keys.get_column(key).drop_nulls().unique()
+
+    capacity = max(min_capacity, 2 * len(keys))
+    bloom = BloomFilter.from_capacity(capacity, false_positive_rate)
+    bloom.add(keys)
+
+    index = {
+        "key": key,
+        "capacity": capacity,
+        "false_positive_rate": false_positive_rate,
+        "num_keys": len(keys),
+        "num_rows": count_table_rows(manifest),
+        "segments": write_key_segments(keys, container_name, table_folder, blob_service_client, segment_rows),
+        "bloom": bloom,
+        "bloom_path": (previous or {}).get("bloom_path")
+    }
+    save_key_index(index, container_name, table_folder, blob_service_client)
+
+    # The segments of the previous index are not referenced anymore
+    if previous is not None:
+        delete_blobs_from_container(container_name, [segment["path"] for segment in previous["segments"]], blob_service_client)
+
+    print(f"Built the key index of {container_name}/{table_folder}: {len(keys)} keys, {len(index['segments'])} segments")
+    return index
+
+
+def get_key_index(container_name: str, table_folder: str, key: str, manifest: dict, blob_service_client: BlobServiceClient,
+                  index_config: Optional[dict] = None) -> dict:
+    """
+    Returns the key index of a table, rebuilt when it is missing, out of date or over capacity.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param key: Key column of the table
+    :param manifest: Current manifest of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param index_config: 'false_positive_rate', 'min_capacity', 'max_segments' and 'segment_rows' of the index
+    :return: The key index
+    """
+    index_config = index_config or {}
+    index = load_key_index(container_name, table_folder, blob_service_client)
+
+    if index is not None and index["num_rows"] == count_table_rows(manifest) and index["num_keys"] <= index["capacity"]:
+        return index
+
+    return build_key_index(
+        container_name, table_folder, key, manifest, blob_service_client,
+        index_config.get('false_positive_rate', 0.01),
+        index_config.get('min_capacity', 100000),
+        index_config.get('segment_rows', 1000000)
+    )
+
+
+def find_candidate_segments(segments: List[dict], candidates: pl.Series) -> List[dict]:
+    """
+    Returns the key segments whose range holds at least one candidate key. The keys are uniformly
+    distributed hashes, so the range of the whole batch of candidates overlaps almost every segment,
+    each segment is instead looked up in the sorted candidates by binary search.
+
+    :param segments: Key segments of the index, with their 'key_min' and 'key_max'
+    :param candidates: Sorted candidate keys
+    :return: The segments that may hold one of the candidates
+    """
+    if not segments or candidates.is_empty():
+        return []
+
+    # First candidate not below the segment minimum, first candidate above the segment maximum
+    starts = candidates.search_sorted(pl.Series([segment["key_min"] for segment in segments], dtype=pl.String), side="left")
+    ends = candidates.search_sorted(pl.Series([segment["key_max"] for segment in segments], dtype=pl.String), side="right")
+    return [segment for segment, start, end in zip(segments, starts, ends) if end > start]
+
+
+def filter_new_keys(df: pl.DataFrame, key: str, index: dict, container_name: str, blob_service_client: BlobServiceClient) -> pl.DataFrame:
+    """
+    Keeps the rows of a DataFrame whose key is not in the index. Keys rejected by the Bloom filter are
+    new without any read, the others are confirmed against the key segments that may hold them.
+
+    :param df: Polars DataFrame to filter
+    :param key: Key column of the DataFrame
+    :param index: Key index of the table
+    :param container_name: Name of the Azure Blob Storage container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The rows of the DataFrame whose key is new
+    :raises ValueError: If a key of the DataFrame is null
+    """
+    if df.is_empty():
+        return df
+
+    # A null key cannot be indexed, it would be reported as new on every run
+    num_null_keys = df.get_column(key).null_count()
+    if num_null_keys > 0:
+        raise ValueError(f"Column '{key}' has {num_null_keys} null keys, they cannot be checked against the key index.")
+
+    maybe_known = pl.Series(index["bloom"].might_contain(df.get_column(key)))
+    df_candidates = df.filter(maybe_known)
+    if df_candidates.is_empty():
+        return df
+
+    candidates = df_candidates.get_column(key).unique().sort()
+    segments = find_candidate_segments(index["segments"], candidates)
+    if not segments:
+        return df
+
+    df_known = read_parquets_from_container(container_name, [segment["path"] for segment in segments], blob_service_client)
+    if df_known is None:
+        raise RuntimeError(f"Could not read the key segments of {container_name}")
+
+    known = df_known.get_column("key").filter(df_known.get_column("key").is_in(candidates.implode()))
+    print(f"Key index: {len(df) - len(df_candidates)} keys rejected by the Bloom filter, "
+          f"{len(candidates)} checked in {len(segments)} segments, {len(known)} already known")
+    return df.filter(~pl.col(key).is_in(known.implode()))
+
+
+def add_keys_to_index(index: dict, keys: pl.Series, num_rows: int, container_name: str, table_folder: str,
+                      blob_service_client: BlobServiceClient, index_config: Optional[dict] = None) -> dict:
+    """
+    Adds the keys of rows appended to the table: their bits are set in the Bloom filter and they are
+    written as a new key segment. Segments are merged into disjoint sorted segments once there are
+    more than `max_segments` of them.
+
+    :param index: Key index of the table
+    :param keys: New keys, not in the index yet
+    :param num_rows: Number of rows appended to the table
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param index_config: 'max_segments' and 'segment_rows' of the index
+    :return: The updated index, already saved
+    :raises ValueError: If a key is null
+    """
+    if keys.null_count() > 0:
+        raise ValueError(f"{keys.null_count()} null keys cannot be added to the key index.")
+
+    index_config = index_config or {}
+    segment_rows = index_config.get('segment_rows', 1000000)
+    keys = keys.unique()
+
+    index["bloom"].add(keys)
+    index["segments"] = index["segments"] + write_key_segments(keys, container_name, table_folder, blob_service_client, segment_rows)
+    index["num_keys"] += len(keys)
+    index["num_rows"] += num_rows
+
+    replaced = []
+    if len(index["segments"]) > index_config.get('max_segments', 16):
+        df_keys = read_parquets_from_container(container_name, [segment["path"] for segment in index["segments"]], blob_service_client)
+        if df_keys is None:
+            raise RuntimeError(f"Could not read the key segments of {container_name}/{table_folder}")
+        replaced = [segment["path"] for segment in index["segments"]]
+        index["segments"] = write_key_segments(df_keys.get_column("key"), container_name, table_folder, blob_service_client, segment_rows)
+
+    save_key_index(index, container_name, table_folder, blob_service_client)
+    if replaced:
+        delete_blobs_from_container(container_name, replaced, blob_service_client)
+    return index
@@ -0,0 +1,503 @@
+import json
+import uuid
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple, Union
+
+import polars as pl
+from azure.storage.blob import BlobServiceClient
+
+from utils.azure_blob_utils import (
+    write_blob_to_container,
+    write_json_to_container,
+    read_json_from_container,
+    read_parquets_from_container,
+    delete_blobs_from_container,
+    get_partition_path,
+    parse_partition_path,
+    partition_matches
+)
+from utils.key_index import get_key_index, filter_new_keys, add_keys_to_index, count_table_rows
+
+
+# Append-only tables: immutable Parquet part files listed by versioned JSON manifests.
+# Updated rows are written to new parts, the parts they replace are rewritten and removed by the same version.
+#
+# {table_folder}/_manifest/v00000042.json   one manifest per version, never rewritten
+# {table_folder}/_manifest/_latest.json     pointer to the current version, written last, and to the
+#                                           last version whose files were vacuumed
+# {table_folder}/[key=value/...]part-*.parquet
+#
+# Every part of a manifest is described by its path, number of rows, partition values and
+# the min/max of the table key, so that writers and readers can skip parts without opening
+# them. A single writer per table is assumed, as with the Dagster assets writing them.
+MANIFEST_FOLDER = "_manifest"
+
+# Column holding the path of the part a row was read from, see read_stored_rows
+PART_PATH_COLUMN = "_partPath"
+
+
+def get_manifest_path(table_folder: str, version: int) -> str:
+    """
+    Returns the path of a version of the manifest of a table.
+
+    :param table_folder: Folder of the table in the container
+    :param version: Version of the manifest
+    :return: Path to the manifest in the container
+    """
+    return f"{table_folder}/{MANIFEST_FOLDER}/v{version:08d}.json"
+
+
+def get_latest_pointer_path(table_folder: str) -> str:
+    """
+    Returns the path of the pointer to the current version of the manifest of a table.
+
+    :param table_folder: Folder of the table in the container
+    :return: Path to the pointer in the container
+    """
+    return f"{table_folder}/{MANIFEST_FOLDER}/_latest.json"
+
+
+def write_latest_pointer(container_name: str, table_folder: str, version: int, vacuumed_version: int,
+                         blob_service_client: BlobServiceClient) -> None:
+    """
+    Writes the pointer to the current version of the manifest of a table.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param version: Current version of the manifest
+    :param vacuumed_version: Last version whose manifest and replaced files were deleted by vacuum_table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    """
+    pointer = {"version": version, "vacuumed_version": vacuumed_version}
+    write_json_to_container(pointer, container_name, get_latest_pointer_path(table_folder), blob_service_client)
+
+
+def load_manifest(container_name: str, table_folder: str, blob_service_client: BlobServiceClient) -> dict:
+    """
+    Loads the current manifest of a table. The files already deleted by vacuum_table, recorded
+    in the pointer, are left out of its 'removed' entries.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The manifest, with 'version' 0 and no part if the table does not exist yet
+    :raises Exception: If the manifest exists but cannot be read, an empty manifest would truncate the table
+    """
+    pointer = read_json_from_container(container_name, get_latest_pointer_path(table_folder), blob_service_client, raise_errors=True)
+    if pointer is None:
+        return {"version": 0, "parts": [], "removed": [], "vacuumed_version": 0}
+
+    manifest = read_json_from_container(container_name, get_manifest_path(table_folder, pointer["version"]), blob_service_client, raise_errors=True)
+    if manifest is None:
+        raise RuntimeError(f"Manifest version {pointer['version']} of {container_name}/{table_folder} is missing")
+
+    # A file removed by version v is deleted once the versions before v are vacuumed
+    vacuumed_version = max(manifest.get("vacuumed_version", 0), pointer.get("vacuumed_version", 0))
+    return {
+        **manifest,
+        "removed": [removed for removed in manifest.get("removed", []) if removed["version"] > vacuumed_version + 1],
+        "vacuumed_version": vacuumed_version
+    }
+
+
+def commit_manifest(container_name: str, table_folder: str, manifest: dict, blob_service_client: BlobServiceClient,
+                    added_parts: List[dict], removed_paths: Collection[str] = ()) -> dict:
+    """
+    Writes the next version of the manifest of a table. The new version is only visible to the
+    readers once the pointer is updated, after the manifest itself is written.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param manifest: Current manifest of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param added_parts: Descriptions of the part files added by this version
+    :param removed_paths: Paths of the part files replaced by this version
+    :return: The new manifest
+    """
+    removed_paths = set(removed_paths)
+    version = manifest["version"] + 1
+    new_manifest = {
+        "version": version,
+        "parts": [part for part in manifest["parts"] if part["path"] not in removed_paths] + added_parts,
+        # Replaced files stay readable by the previous versions until vacuum_table deletes them
+        "removed": manifest.get("removed", []) + [{"path": path, "version": version} for path in sorted(removed_paths)],
+        "vacuumed_version": manifest.get("vacuumed_version", 0)
+    }
+
+    write_json_to_container(new_manifest, container_name, get_manifest_path(table_folder, new_manifest["version"]), blob_service_client)
+    write_latest_pointer(container_name, table_folder, new_manifest["version"], new_manifest["vacuumed_version"], blob_service_client)
+
+    print(f"Committed version {new_manifest['version']} of {container_name}/{table_folder}: "
+          f"{len(added_parts)} parts added, {len(removed_paths)} parts removed")
+    return new_manifest
+
+
+def describe_part(path: str, df: pl.DataFrame, key: str, partition: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Returns the manifest entry of a part file.
+
+    :param path: Path to the part file in the container
+    :param df: Content of the part file
+    :param key: Key column of the table
+    :param partition: Partition values of the part file, if the table is partitioned
+    :return: Dictionary with the 'path', 'num_rows', 'partition', 'key_min' and 'key_max' of the part
+    """
+    return {
+        "path": path,
+        "num_rows": len(df),
+        "partition": partition or {},
+        "key_min": df.get_column(key).min(),
+        "key_max": df.get_column(key).max()
+    }
+
+
+def get_partition_values(df: pl.DataFrame, partition_by: Dict[str, str]) -> List[Dict[str, str]]:
+    """
+    Returns the distinct partition values of a DataFrame, formatted as in the part paths.
+
+    :param df: Polars DataFrame
+    :param partition_by: Ordered mapping of the partition keys to the columns holding their values
+    :return: List of mappings of the partition keys to their values
+    """
+    rows = df.select(list(partition_by.values())).unique().rows()
+    return [{name: str(value) for name, value in zip(partition_by.keys(), row)} for row in rows]
+
+
+def write_parts(df: pl.DataFrame, container_name: str, table_folder: str, key: str, blob_service_client: BlobServiceClient,
+                partition_by: Optional[Dict[str, str]] = None, write_profile: Optional[dict] = None,
+                target_rows: Optional[int] = None) -> List[dict]:
+    """
+    Writes a DataFrame as new immutable part files, one or more per partition.
+
+    :param df: Polars DataFrame to write
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param key: Key column of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param partition_by: Ordered mapping of the partition keys to the columns holding their values
+    :param write_profile: Parquet and upload settings of the target layer
+    :param target_rows: Maximum number of rows per part file, no limit if None
+    :return: The manifest entries of the written parts
+    """
+    if partition_by:
+        groups = df.partition_by(list(partition_by.values()), as_dict=True, maintain_order=True)
+        groups = [({name: str(value) for name, value in zip(partition_by.keys(), values)}, df_group) for values, df_group in groups.items()]
+    else:
+        groups = [({}, df)]
+
+    parts = []
+    for partition, df_group in groups:
+        parts.extend(write_partition_parts(df_group, partition, container_name, table_folder, key, blob_service_client, write_profile, target_rows))
+
+    return parts
+
+
+def write_partition_parts(df: pl.DataFrame, partition: Dict[str, str], container_name: str, table_folder: str, key: str,
+                          blob_service_client: BlobServiceClient, write_profile: Optional[dict] = None,
+                          target_rows: Optional[int] = None) -> List[dict]:
+    """
+    Writes the rows of a single partition as new part files of at most `target_rows` rows.
+
+    :param df: Polars DataFrame holding the rows of the partition
+    :param partition: Partition values of the rows, empty if the table is not partitioned
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param key: Key column of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param write_profile: Parquet and upload settings of the target layer
+    :param target_rows: Maximum number of rows per part file, no limit if None
+    :return: The manifest entries of the written parts
+    """
+    parts = []
+    chunk_size = target_rows or max(len(df), 1)
+    for offset in range(0, len(df), chunk_size):
+        df_part = df.slice(offset, chunk_size)
+        path = get_partition_path(table_folder, partition, f"part-{uuid.uuid4().hex}.parquet")
+        write_blob_to_container(df_part, container_name, path, blob_service_client, write_profile)
+        parts.append(describe_part(path, df_part, key, partition))
+
+    return parts
+
+
+def find_candidate_parts(manifest: dict, df: pl.DataFrame, key: str, partition_by: Optional[Dict[str, str]] = None) -> List[dict]:
+    """
+    Returns the parts of a table that may hold keys of a DataFrame, using the partition values and
+    the key min/max recorded in the manifest.
+
+    :param manifest: Current manifest of the table
+    :param df: Polars DataFrame holding the keys to look for
+    :param key: Key column of the table
+    :param partition_by: Ordered mapping of the partition keys to the columns holding their values
+    :return: The manifest entries of the candidate parts
+    """
+    if df.is_empty():
+        return []
+
+    key_min, key_max = df.get_column(key).min(), df.get_column(key).max()
+    partitions = None
+    if partition_by:
+        partitions = {json.dumps(partition, sort_keys=True) for partition in get_partition_values(df, partition_by)}
+
+    return [
+        part for part in manifest["parts"]
+        if part["key_max"] >= key_min and part["key_min"] <= key_max
+        and (partitions is None or json.dumps(part["partition"], sort_keys=True) in partitions)
+    ]
+
+
+def read_stored_rows(df: pl.DataFrame, parts: List[dict], key: str, container_name: str,
+                     blob_service_client: BlobServiceClient) -> pl.DataFrame:
+    """
+    Reads the rows of the given parts whose key is in a DataFrame. The key filter is pushed down
+    to the Parquet reader, so the row groups whose key statistics exclude every key are skipped.
+
+    :param df: Polars DataFrame holding the keys to look for
+    :param parts: Manifest entries of the parts to read
+    :param key: Key column of the table
+    :param container_name: Name of the Azure Blob Storage container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The stored rows, with the path of their part in the PART_PATH_COLUMN column
+    """
+    if not parts or df.is_empty():
+        return df.clear().with_columns(pl.lit(None, dtype=pl.String).alias(PART_PATH_COLUMN))
+
+    df_stored = read_parquets_from_container(
+        container_name, [part["path"] for part in parts], blob_service_client,
+        row_filters=[(key, "in", df.get_column(key).to_list())], path_column=PART_PATH_COLUMN
+    )
+    if df_stored is None:
+        raise RuntimeError(f"Could not read the parts of {container_name} holding the keys to upsert")
+    return df_stored
+
+
+def upsert_table(df: pl.DataFrame, container_name: str, table_folder: str, key: str, blob_service_client: BlobServiceClient,
+                 partition_by: Optional[Dict[str, str]] = None, write_profile: Optional[dict] = None,
+                 index_config: Optional[dict] = None) -> Tuple[dict, int, int]:
+    """
+    Inserts the rows of a DataFrame whose key is not in the table yet and replaces the stored rows whose
+    key is in the DataFrame with different values, then commits a new manifest version. Parts are never
+    modified in place: the parts holding replaced rows are rewritten without them and removed by the
+    same version. Stored rows identical to the new ones are left untouched, so re-scraped articles
+    do not rewrite any part. Within the DataFrame, the last row of a key wins.
+
+    With `index_config`, the keys are checked against the key index of the table, which is updated
+    with the inserted keys, and only the parts of the known keys are read. Otherwise the parts that may
+    hold the keys according to the manifest are read.
+
+    :param df: Polars DataFrame to upsert
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param key: Key column of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param partition_by: Ordered mapping of the partition keys to the columns holding their values
+    :param write_profile: Parquet and upload settings of the target layer
+    :param index_config: Settings of the key index, see key_index.get_key_index
+    :return: A tuple (manifest, number of rows inserted, number of rows updated)
+    """
+    manifest = load_manifest(container_name, table_folder, blob_service_client)
+    df = df.unique(subset=key, keep="last", maintain_order=True)
+
+    # Rows whose key may be stored, the keys the index knows to be new are inserted without any read
+    index = None
+    df_candidates = df
+    if index_config is not None:
+        index = get_key_index(container_name, table_folder, key, manifest, blob_service_client, index_config)
+        df_new = filter_new_keys(df, key, index, container_name, blob_service_client)
+        df_candidates = df.join(df_new.select(key), on=key, how="anti")
+
+    # Look for the stored rows in the partitions of the new rows
+    parts = find_candidate_parts(manifest, df_candidates, key, partition_by)
+    df_stored = read_stored_rows(df_candidates, parts, key, container_name, blob_service_client)
+    if index is not None and partition_by:
+        # A key known to the index but not found in its partition was stored under other partition values
+        df_moved = df_candidates.join(df_stored.select(key), on=key, how="anti")
+        other_parts = [part for part in find_candidate_parts(manifest, df_moved, key) if part not in parts]
+        df_stored = pl.concat([df_stored, read_stored_rows(df_moved, other_parts, key, container_name, blob_service_client)], how="diagonal_relaxed")
+        parts = parts + other_parts
+    print(f"{len(parts)} of {len(manifest['parts'])} parts checked for existing keys")
+
+    df_inserted = df.join(df_stored.select(key), on=key, how="anti")
+
+    # A stored key is updated only when one of its values changed
+    value_columns = [column for column in df.columns if column != key and column in df_stored.columns]
+    df_compared = df.join(df_stored, on=key, how="inner", suffix="_stored")
+    df_changed = df_compared.filter(
+        pl.any_horizontal([~pl.col(column).eq_missing(pl.col(f"{column}_stored")) for column in value_columns])
+        if value_columns else pl.lit(False)
+    )
+    df_updated = df_changed.select(df.columns).unique(subset=key, keep="first", maintain_order=True)
+
+    print(f"{len(df_inserted)} new rows and {len(df_updated)} updated rows for {container_name}/{table_folder}")
+    if df_inserted.is_empty() and df_updated.is_empty():
+        return manifest, 0, 0
+
+    # The parts holding updated keys are written again without them
+    removed_paths = df_changed.get_column(PART_PATH_COLUMN).unique().to_list()
+    added_parts = []
+    if removed_paths:
+        df_rewritten = read_parquets_from_container(container_name, removed_paths, blob_service_client, path_column=PART_PATH_COLUMN)
+        if df_rewritten is None:
+            raise RuntimeError(f"Could not read the parts of {container_name}/{table_folder} to rewrite")
+        df_kept = df_rewritten.join(df_updated.select(key), on=key, how="anti")
+        for part in manifest["parts"]:
+            if part["path"] in removed_paths:
+                df_part = df_kept.filter(pl.col(PART_PATH_COLUMN) == part["path"]).drop(PART_PATH_COLUMN)
+                added_parts.extend(write_partition_parts(df_part, part["partition"], container_name, table_folder, key,
+                                                         blob_service_client, write_profile))
+
+    added_parts.extend(write_parts(pl.concat([df_inserted, df_updated]), container_name, table_folder, key,
+                                   blob_service_client, partition_by, write_profile))
+    num_rows_before = count_table_rows(manifest)
+    manifest = commit_manifest(container_name, table_folder, manifest, blob_service_client, added_parts, removed_paths)
+
+    # The index is only updated once the rows it describes are committed
+    if index is not None:
+        add_keys_to_index(index, df_inserted.get_column(key), count_table_rows(manifest) - num_rows_before,
+                          container_name, table_folder, blob_service_client, index_config)
+
+    return manifest, len(df_inserted), len(df_updated)
+
+
+def is_data_part_path(table_folder: str, path: str) -> bool:
+    """
+    Tells whether a path is a data file of a table, and not a file of its manifest or key index.
+    The folders of the table format start with an underscore, partition folders never do.
+
+    :param table_folder: Folder of the table in the container
+    :param path: Path to the file in the container
+    :return: True if the file holds rows of the table
+    """
+    relative_path = path[len(table_folder):].strip("/")
+    return path.startswith(f"{table_folder}/") and path.endswith(".parquet") \
+        and not any(name.startswith("_") for name in relative_path.split("/"))
+
+
+def register_parts(container_name: str, table_folder: str, paths: List[str], key: str, blob_service_client: BlobServiceClient) -> dict:
+    """
+    Adds existing Parquet files of the table folder to the manifest, without rewriting them.
+    Used to adopt the files of a table written before it had a manifest. Files of the manifest and
+    key index folders, parts already listed and parts removed by a version but not vacuumed yet are skipped.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param paths: Paths to the files in the container
+    :param key: Key column of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :return: The new manifest
+    """
+    manifest = load_manifest(container_name, table_folder, blob_service_client)
+
+    known_paths = {part["path"] for part in manifest["parts"]} | {removed["path"] for removed in manifest.get("removed", [])}
+    new_paths = [path for path in paths if is_data_part_path(table_folder, path) and path not in known_paths]
+    print(f"{len(new_paths)} of {len(paths)} files are data parts missing from the manifest")
+    if not new_paths:
+        return manifest
+
+    parts = []
+    for path in new_paths:
+        df_keys = read_parquets_from_container(container_name, [path], blob_service_client, columns=[key])
+        if df_keys is None:
+            raise RuntimeError(f"Could not read the keys of {container_name}/{path}")
+        parts.append(describe_part(path, df_keys, key, parse_partition_path(table_folder, path)))
+
+    return commit_manifest(container_name, table_folder, manifest, blob_service_client, parts)
+
+
+def read_table(container_name: str, table_folder: str, blob_service_client: BlobServiceClient,
+               filters: Optional[Dict[str, Union[Callable[[str], bool], Collection[str]]]] = None,
+               columns: Optional[List[str]] = None, row_filters: Optional[List[Any]] = None) -> Union[pl.DataFrame, None]:
+    """
+    Reads the current version of a table. The parts are taken from the manifest, the container is not listed,
+    and only the parts of the partitions matching the filters are downloaded.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param filters: Partition filters, see azure_blob_utils.partition_matches
+    :param columns: Columns to read, all columns if None
+    :param row_filters: Row filters in the pyarrow DNF format, see azure_blob_utils.read_parquet_blob
+    :return: Polars DataFrame, or None if no part matches or the operation fails
+    """
+    manifest = load_manifest(container_name, table_folder, blob_service_client)
+    paths = [part["path"] for part in manifest["parts"] if partition_matches(part["partition"], filters)]
+
+    print(f"{len(paths)} parts of {container_name}/{table_folder} (version {manifest['version']}) match the filters")
+    return read_parquets_from_container(container_name, paths, blob_service_client, columns=columns, row_filters=row_filters)
+
+
+def compact_table(container_name: str, table_folder: str, key: str, blob_service_client: BlobServiceClient,
+                  target_rows: int = 100000, min_parts: int = 8, write_profile: Optional[dict] = None) -> dict:
+    """
+    Rewrites the partitions holding at least `min_parts` parts smaller than `target_rows` as parts of
+    `target_rows` rows sorted by key, then commits a new manifest version. The replaced files are kept
+    for the readers of the previous versions, see vacuum_table.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param key: Key column of the table
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param target_rows: Number of rows of the compacted parts
+    :param min_parts: Number of small parts from which a partition is compacted
+    :param write_profile: Parquet and upload settings of the target layer
+    :return: The manifest, unchanged if nothing needed compaction
+    """
+    manifest = load_manifest(container_name, table_folder, blob_service_client)
+
+    # Group the small parts by partition
+    small_parts: Dict[str, List[dict]] = {}
+    for part in manifest["parts"]:
+        if part["num_rows"] < target_rows:
+            small_parts.setdefault(json.dumps(part["partition"], sort_keys=True), []).append(part)
+
+    added_parts, removed_paths = [], []
+    for parts in small_parts.values():
+        if len(parts) < min_parts:
+            continue
+
+        paths = [part["path"] for part in parts]
+        df = read_parquets_from_container(container_name, paths, blob_service_client)
+        if df is None:
+            raise RuntimeError(f"Could not read the parts of {container_name}/{table_folder} to compact")
+
+        # Sorted parts get disjoint key ranges, so that lookups skip most of them
+        added_parts.extend(write_partition_parts(
+            df.sort(key), parts[0]["partition"], container_name, table_folder, key, blob_service_client, write_profile, target_rows
+        ))
+        removed_paths.extend(paths)
+
+    if not removed_paths:
+        return manifest
+
+    return commit_manifest(container_name, table_folder, manifest, blob_service_client, added_parts, removed_paths)
+
+
+def vacuum_table(container_name: str, table_folder: str, blob_service_client: BlobServiceClient, retain_versions: int = 3) -> int:
+    """
+    Deletes the part files and manifests that can only be read through versions older than the last
+    `retain_versions` ones. The live parts are unchanged, so no manifest version is committed: the
+    vacuumed version is recorded in the pointer and the next version leaves the deleted files out.
+
+    :param container_name: Name of the Azure Blob Storage container
+    :param table_folder: Folder of the table in the container
+    :param blob_service_client: BlobServiceClient object for Azure Blob Storage
+    :param retain_versions: Number of recent versions that stay readable
+    :return: The number of blobs deleted
+    """
+    manifest = load_manifest(container_name, table_folder, blob_service_client)
+    oldest_retained = manifest["version"] - retain_versions + 1
+
+    # A file removed by version v is only referenced by the versions before v
+    expired = [removed for removed in manifest.get("removed", []) if removed["version"] <= oldest_retained]
+    expired_manifests = [
+        get_manifest_path(table_folder, version)
+        for version in range(manifest.get("vacuumed_version", 0) + 1, oldest_retained)
+    ]
+    if not expired and not expired_manifests:
+        return 0
+
+    num_deleted = delete_blobs_from_container(container_name, [removed["path"] for removed in expired] + expired_manifests, blob_service_client)
+
+    vacuumed_version = max(manifest["vacuumed_version"], oldest_retained - 1)
+    write_latest_pointer(container_name, table_folder, manifest["version"], vacuumed_version, blob_service_client)
+
+    print(f"Vacuumed {container_name}/{table_folder} up to version {vacuumed_version}")
+    return num_deleted
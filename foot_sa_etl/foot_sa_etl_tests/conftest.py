@@ -0,0 +1,104 @@
+import os
+import sys
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+# The modules of the project import each other from the foot_sa_etl folder
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../foot_sa_etl')))
+
+
+class InMemoryBlobClient:
+    """
+    Client of a single blob of an InMemoryBlobServiceClient, with the calls used by utils.azure_blob_utils.
+    Every upload gives the blob a new ETag.
+    """
+
+    def __init__(self, blobs: dict, container_name: str, blob_name: str):
+        self.blobs = blobs
+        self.key = (container_name, blob_name)
+
+    def get_blob(self):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        if self.key not in self.blobs:
+            raise ResourceNotFoundError(f"{self.key[0]}/{self.key[1]} not found")
+        return self.blobs[self.key]
+
+    def upload_blob(self, data, blob_type: str = "BlockBlob", overwrite: bool = False) -> None:
+        if hasattr(data, "getvalue"):
+            data = data.getvalue()
+        self.blobs[self.key] = (bytes(data), uuid.uuid4().hex)
+
+    def download_blob(self, max_concurrency: int = 1, offset: int = None, length: int = None):
+        data, etag = self.get_blob()
+        if offset is not None:
+            data = data[offset:offset + length]
+        return SimpleNamespace(
+            properties=SimpleNamespace(etag=etag, size=len(data)),
+            readall=lambda: data,
+            readinto=lambda stream: stream.write(data)
+        )
+
+    def get_blob_properties(self):
+        data, etag = self.get_blob()
+        return SimpleNamespace(etag=etag, size=len(data))
+
+    def exists(self) -> bool:
+        return self.key in self.blobs
+
+
+class InMemoryContainerClient:
+    def __init__(self, blobs: dict, container_name: str):
+        self.blobs = blobs
+        self.container_name = container_name
+
+    def get_blob_client(self, blob_name: str) -> InMemoryBlobClient:
+        return InMemoryBlobClient(self.blobs, self.container_name, blob_name)
+
+    def list_blobs(self, name_starts_with: str = ""):
+        return [
+            SimpleNamespace(name=name, etag=etag)
+            for (container_name, name), (_, etag) in sorted(self.blobs.items())
+            if container_name == self.container_name and name.startswith(name_starts_with or "")
+        ]
+
+    def delete_blob(self, blob_name: str) -> None:
+        client = self.get_blob_client(blob_name)
+        client.get_blob()
+        del self.blobs[client.key]
+
+
+class InMemoryBlobServiceClient:
+    """
+    Stand-in for azure.storage.blob.BlobServiceClient keeping the blobs in a dictionary,
+    keyed by (container name, blob name) and holding (content, ETag).
+    """
+
+    account_name = "memory"
+
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blob_client(self, container: str, blob: str) -> InMemoryBlobClient:
+        return InMemoryBlobClient(self.blobs, container, blob)
+
+    def get_container_client(self, container: str) -> InMemoryContainerClient:
+        return InMemoryContainerClient(self.blobs, container)
+
+    def list_names(self, container_name: str, prefix: str = "") -> list:
+        return [blob.name for blob in self.get_container_client(container_name).list_blobs(prefix)]
+
+
+@pytest.fixture
+def blob_service_client(tmp_path, monkeypatch):
+    """
+    In-memory blob store, with a blob cache and listing snapshots private to the test.
+    """
+    pytest.importorskip("azure.storage.blob")
+    import utils.azure_blob_utils as azure_blob_utils
+
+    monkeypatch.setattr(azure_blob_utils, "_blob_cache", azure_blob_utils.LocalBlobCache(str(tmp_path / "blob_cache")))
+    monkeypatch.setattr(azure_blob_utils, "_listing_cache", {})
+    return InMemoryBlobServiceClient()
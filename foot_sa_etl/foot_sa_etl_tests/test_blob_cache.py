@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+# The blob cache reads through the Azure SDK
+pytest.importorskip("azure.storage.blob")
+
+import utils.azure_blob_utils as azure_blob_utils
+from utils.azure_blob_utils import LocalBlobCache, get_blob_cache_stats
+
+
+CONTAINER = "gold"
+
+
+def upload(blob_service_client, name: str, data: bytes) -> None:
+    blob_service_client.get_blob_client(CONTAINER, name).upload_blob(data, overwrite=True)
+
+
+def read(cache: LocalBlobCache, blob_service_client, name: str) -> bytes:
+    with cache.open_path(CONTAINER, name, blob_service_client) as path:
+        with open(path, 'rb') as file:
+            return file.read()
+
+
+def list_entries(cache: LocalBlobCache) -> list:
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith('.blob'))
+
+
+def test_open_path_serves_unchanged_blobs_from_disk(blob_service_client, tmp_path):
+    cache = LocalBlobCache(str(tmp_path / "cache"))
+    upload(blob_service_client, "a.parquet", b"first")
+
+    assert read(cache, blob_service_client, "a.parquet") == b"first"
+    assert read(cache, blob_service_client, "a.parquet") == b"first"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_open_path_downloads_a_rewritten_blob_and_drops_the_stale_entry(blob_service_client, tmp_path):
+    cache = LocalBlobCache(str(tmp_path / "cache"))
+    upload(blob_service_client, "a.parquet", b"first")
+    read(cache, blob_service_client, "a.parquet")
+    stale_entries = list_entries(cache)
+
+    upload(blob_service_client, "a.parquet", b"second")
+
+    assert read(cache, blob_service_client, "a.parquet") == b"second"
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert len(list_entries(cache)) == 1 and list_entries(cache) != stale_entries
+
+
+def test_evict_removes_least_recently_used_entries(blob_service_client, tmp_path):
+    cache = LocalBlobCache(str(tmp_path / "cache"), max_bytes=250)
+    for used_at, name in enumerate(["a.parquet", "b.parquet", "c.parquet"]):
+        entries = list_entries(cache)
+        upload(blob_service_client, name, name[0].encode() * 100)
+        read(cache, blob_service_client, name)
+
+        # Distinct use times, entries written within the same clock tick would tie
+        for entry in set(list_entries(cache)) - set(entries):
+            os.utime(os.path.join(cache.directory, entry), (used_at, used_at))
+
+    # 'a' was the least recently used entry
+    assert len(list_entries(cache)) == 2
+    read(cache, blob_service_client, "b.parquet")
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_evict_skips_pinned_entries(blob_service_client, tmp_path):
+    cache = LocalBlobCache(str(tmp_path / "cache"), max_bytes=150)
+    upload(blob_service_client, "large.parquet", b"x" * 300)
+    upload(blob_service_client, "small.parquet", b"y" * 100)
+
+    with cache.open_path(CONTAINER, "large.parquet", blob_service_client) as path:
+        # The entry is larger than the cache but stays readable while it is pinned
+        read(cache, blob_service_client, "small.parquet")
+        with open(path, 'rb') as file:
+            assert file.read() == b"x" * 300
+
+    cache.evict()
+    assert len(list_entries(cache)) == 1
+
+
+def test_open_path_without_flock_bypasses_the_cache(blob_service_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(azure_blob_utils, "fcntl", None)
+    cache = LocalBlobCache(str(tmp_path / "cache"))
+    upload(blob_service_client, "a.parquet", b"first")
+
+    with cache.open_path(CONTAINER, "a.parquet", blob_service_client) as path:
+        with open(path, 'rb') as file:
+            assert file.read() == b"first"
+
+    assert not os.path.exists(path)
+    assert list_entries(cache) == []
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_get_blob_cache_stats_reports_the_process_cache(blob_service_client):
+    upload(blob_service_client, "a.parquet", b"first")
+    read(azure_blob_utils.get_blob_cache(), blob_service_client, "a.parquet")
+    read(azure_blob_utils.get_blob_cache(), blob_service_client, "a.parquet")
+
+    assert get_blob_cache_stats() == {"blob_cache_hits": 1, "blob_cache_misses": 1}
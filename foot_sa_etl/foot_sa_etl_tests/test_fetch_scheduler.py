@@ -0,0 +1,130 @@
+import time
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# The bronze asset module needs dagster and aiohttp to be imported
+pytest.importorskip("dagster")
+pytest.importorskip("aiohttp")
+
+from assets.bronze_assets.scrappe_epl_news import HostConcurrencyLimiter, FetchScheduler
+
+
+def create_limiter(initial_limit: int = 4, latency_target: float = 2.0) -> HostConcurrencyLimiter:
+    return HostConcurrencyLimiter(initial_limit, min_limit=1, max_limit=8, latency_target=latency_target)
+
+
+def test_limiter_caps_in_flight_requests():
+    limiter = create_limiter(initial_limit=2)
+    in_flight, max_in_flight = 0, 0
+
+    async def request():
+        nonlocal in_flight, max_in_flight
+        await limiter.acquire()
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        await limiter.release()
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+
+    assert max_in_flight == 2
+    assert limiter.in_flight == 0
+
+
+def test_limiter_increases_additively_after_fast_responses():
+    limiter = create_limiter(initial_limit=4)
+
+    async def run():
+        for _ in range(4):
+            await limiter.on_success(latency=0.1)
+
+    asyncio.run(run())
+
+    # About one slot per window of `limit` fast responses
+    assert 4.9 < limiter.limit < 5.0
+
+
+def test_limiter_increase_is_capped_at_max_limit():
+    limiter = create_limiter(initial_limit=8)
+
+    asyncio.run(limiter.on_success(latency=0.1))
+
+    assert limiter.limit == 8
+
+
+def test_limiter_decreases_once_per_latency_window():
+    limiter = create_limiter(initial_limit=8, latency_target=1)
+
+    async def run():
+        await limiter.on_success(latency=2)
+        await limiter.on_backoff()
+
+    asyncio.run(run())
+
+    # A burst of throttling signals from the same window of requests halves the limit once
+    assert limiter.limit == 4
+
+
+def test_limiter_decrease_is_floored_at_min_limit():
+    limiter = create_limiter(initial_limit=1, latency_target=0)
+
+    async def run():
+        for _ in range(3):
+            await limiter.on_backoff()
+
+    asyncio.run(run())
+
+    assert limiter.limit == 1
+
+
+def test_limiter_waits_for_retry_after():
+    limiter = create_limiter()
+
+    async def run():
+        await limiter.on_backoff(retry_after=0.2)
+        start = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.15
+
+
+def test_scheduler_hands_out_one_limiter_per_host():
+    scheduler = FetchScheduler(4, 1, 16, 2.0, 60)
+
+    async def run():
+        for url in ["https://www.bbc.com/sport/a", "https://www.bbc.com/sport/b", "https://example.com/c"]:
+            async with scheduler.slot(url):
+                pass
+
+    asyncio.run(run())
+
+    assert scheduler.limiter_for("https://www.bbc.com/x") is scheduler.limiter_for("https://www.bbc.com/y")
+    assert scheduler.requests_sent == 3
+    assert scheduler.concurrency_limits() == {"www.bbc.com": 4, "example.com": 4}
+    assert scheduler.requests_per_second() > 0
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("not a date", None),
+    ("5", 5.0),
+    ("-3", 0.0),
+    ("3600", 60.0)
+])
+def test_parse_retry_after(value, expected):
+    assert FetchScheduler(4, 1, 16, 2.0, 60).parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    value = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+
+    assert 25 <= FetchScheduler(4, 1, 16, 2.0, 60).parse_retry_after(value) <= 30
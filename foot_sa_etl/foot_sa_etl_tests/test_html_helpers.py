@@ -0,0 +1,119 @@
+import os
+import glob
+
+import pytest
+
+from utils.html_helpers import (
+    compare_extraction_engines,
+    extract_fields_with_bs4,
+    extract_fields_with_lxml,
+    has_unclosed_paragraphs,
+    trim_to_articles,
+    HEADLINE_CLASS,
+    PARAGRAPH_CLASS
+)
+
+
+# Hand-written pages in the markup of the BBC team pages for the parity of the extraction engines,
+# recorded pages can be added to the folder
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Ill-formed articles on which libxml2 and html.parser build different trees
+HEADLINE = f'<span class="{HEADLINE_CLASS}"><span>Headline</span></span>'
+ILL_FORMED_PAGES = {
+    "unclosed_paragraphs": f'<article>{HEADLINE}<p class="{PARAGRAPH_CLASS}">One<p class="{PARAGRAPH_CLASS}">Two</p></article>',
+    "block_in_paragraph": f'<article>{HEADLINE}<p class="{PARAGRAPH_CLASS}">One<div>Two</div>Three</p></article>',
+    "self_closing_paragraph": f'<article>{HEADLINE}<p class="{PARAGRAPH_CLASS}"/>One<p class="{PARAGRAPH_CLASS}">Two</p></article>',
+    "unclosed_trailing_article": f'<article>{HEADLINE}<p class="{PARAGRAPH_CLASS}">One</p></article>'
+                                 f'<article>{HEADLINE}<p class="{PARAGRAPH_CLASS}">Two</p>'
+}
+
+
+def load_page(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def page_names():
+    return [os.path.basename(path) for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))]
+
+
+def page_params():
+    params = [pytest.param(load_page(name), id=name) for name in page_names()]
+    params += [pytest.param(html, id=name) for name, html in ILL_FORMED_PAGES.items()]
+    return params
+
+
+@pytest.mark.parametrize("html", page_params())
+def test_engines_agree_on_pages(html):
+    assert extract_fields_with_lxml(html) == extract_fields_with_bs4(html)
+
+
+@pytest.mark.parametrize("html", page_params())
+def test_engines_agree_on_trimmed_pages(html):
+    html = trim_to_articles(html)
+    assert extract_fields_with_lxml(html) == extract_fields_with_bs4(html)
+
+
+@pytest.mark.parametrize("html", page_params())
+@pytest.mark.parametrize("extract", [extract_fields_with_bs4, extract_fields_with_lxml], ids=["bs4", "lxml"])
+def test_trimming_keeps_extracted_fields(html, extract):
+    assert extract(trim_to_articles(html)) == extract(html)
+
+
+def test_trimming_keeps_unclosed_trailing_article():
+    articles = extract_fields_with_lxml(trim_to_articles(ILL_FORMED_PAGES["unclosed_trailing_article"]))
+
+    assert [article['content'] for article in articles] == ["One", "Two"]
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("arsenal_page_1.html", False),
+    ("chelsea_page_2.html", False),
+    ("liverpool_page_1.html", True)
+])
+def test_has_unclosed_paragraphs_on_recorded_pages(name, expected):
+    assert has_unclosed_paragraphs(load_page(name)) is expected
+
+
+@pytest.mark.parametrize("html, expected", [
+    (f'<p class="{PARAGRAPH_CLASS}">One</p><div>Two</div>', False),
+    ('<script>var html = "<p>One<div>";</script><p>Two</p>', False),
+    ('<!-- <p>One<div> --><p>Two</p>', False),
+    ('<P>One</P><DIV>Two</DIV>', False),
+    ('<p>One<span>Two</span>', True),
+    ('<p>One<DIV>Two</DIV></p>', True),
+    ('<p/>One', True)
+])
+def test_has_unclosed_paragraphs(html, expected):
+    assert has_unclosed_paragraphs(html) is expected
+
+
+def test_recorded_page_fields():
+    articles = extract_fields_with_bs4(load_page('arsenal_page_1.html'))
+
+    assert [article['title'] for article in articles] == [
+        "Arteta: 'We have to be ruthless' in the title race",
+        "Ødegaard back in training after ankle injury",
+        "Send us your thoughts on Arsenal’s start",
+        "Top headline outside any article"
+    ]
+    assert articles[0]['publishedDate'] == "published at 14:02 2 October"
+    assert articles[1]['content'] == "Martin Ødegaard has returned to full training – a boost for Arteta’s side " \
+                                     "before the international break. Ødegaard was injured while on Norway duty."
+    assert articles[3] == {
+        "publishedDate": "No date found",
+        "title": "Top headline outside any article",
+        "content": "No content found"
+    }
+
+
+@pytest.mark.parametrize("html", ["", "HTTP error 404", "Failed after 3 attempts"])
+def test_engines_agree_on_error_messages(html):
+    assert extract_fields_with_bs4(html) == extract_fields_with_lxml(html) == []
+
+
+def test_compare_extraction_engines_finds_no_mismatch():
+    htmls = [param.values[0] for param in page_params()]
+
+    assert compare_extraction_engines(htmls) == []
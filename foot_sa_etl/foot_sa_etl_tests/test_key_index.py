@@ -0,0 +1,123 @@
+import polars as pl
+import pytest
+
+# The key index reads and writes through the Azure SDK
+pytest.importorskip("azure.storage.blob")
+
+from utils.azure_blob_utils import write_blob_to_container
+from utils.key_index import (
+    BloomFilter,
+    load_key_index,
+    build_key_index,
+    get_key_index,
+    find_candidate_segments,
+    filter_new_keys,
+    add_keys_to_index
+)
+
+
+CONTAINER = "bronze"
+TABLE = "epl_news"
+
+
+def keys(prefix: str, count: int) -> pl.Series:
+    return pl.Series("key", [f"{prefix}{index:05d}" for index in range(count)], dtype=pl.String)
+
+
+def empty_manifest() -> dict:
+    return {"version": 0, "parts": []}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter.from_capacity(1000, 0.01)
+    added = keys("known-", 1000)
+
+    bloom.add(added)
+
+    assert bloom.might_contain(added).all()
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter.from_capacity(1000, 0.01)
+    bloom.add(keys("known-", 1000))
+
+    false_positive_rate = bloom.might_contain(keys("new-", 10000)).mean()
+
+    # Expected about 1%, with margin for the sampling
+    assert false_positive_rate < 0.03
+
+
+def test_bloom_filter_rejects_null_keys():
+    with pytest.raises(ValueError):
+        BloomFilter.from_capacity(10, 0.01).add(pl.Series(["a", None]))
+
+
+def test_bloom_filter_bits_survive_a_reload(blob_service_client):
+    index = build_key_index(CONTAINER, TABLE, "_hashedId", empty_manifest(), blob_service_client, min_capacity=100)
+    add_keys_to_index(index, keys("known-", 50), 50, CONTAINER, TABLE, blob_service_client)
+
+    reloaded = load_key_index(CONTAINER, TABLE, blob_service_client)
+
+    assert (reloaded["num_keys"], reloaded["num_rows"]) == (50, 50)
+    assert reloaded["bloom"].might_contain(keys("known-", 50)).all()
+
+
+def test_find_candidate_segments():
+    segments = [
+        {"path": "s0", "key_min": "a", "key_max": "c"},
+        {"path": "s1", "key_min": "d", "key_max": "f"},
+        {"path": "s2", "key_min": "g", "key_max": "i"}
+    ]
+
+    candidates = pl.Series(["b", "h", "z"]).sort()
+
+    assert [segment["path"] for segment in find_candidate_segments(segments, candidates)] == ["s0", "s2"]
+    assert find_candidate_segments(segments, pl.Series([], dtype=pl.String)) == []
+
+
+def test_filter_new_keys_keeps_only_unknown_keys(blob_service_client):
+    index = build_key_index(CONTAINER, TABLE, "_hashedId", empty_manifest(), blob_service_client, min_capacity=100)
+    add_keys_to_index(index, keys("known-", 50), 50, CONTAINER, TABLE, blob_service_client)
+    df = pl.DataFrame({"_hashedId": pl.concat([keys("known-", 50).slice(10, 5), keys("new-", 3)])})
+
+    df_new = filter_new_keys(df, "_hashedId", index, CONTAINER, blob_service_client)
+
+    assert df_new.get_column("_hashedId").to_list() == keys("new-", 3).to_list()
+
+
+def test_filter_new_keys_rejects_null_keys(blob_service_client):
+    index = build_key_index(CONTAINER, TABLE, "_hashedId", empty_manifest(), blob_service_client, min_capacity=100)
+
+    with pytest.raises(ValueError):
+        filter_new_keys(pl.DataFrame({"_hashedId": ["a", None]}), "_hashedId", index, CONTAINER, blob_service_client)
+
+
+def test_add_keys_to_index_merges_segments(blob_service_client):
+    index_config = {"max_segments": 2, "segment_rows": 1000}
+    index = build_key_index(CONTAINER, TABLE, "_hashedId", empty_manifest(), blob_service_client, min_capacity=100)
+
+    for batch in range(3):
+        index = add_keys_to_index(index, keys(f"batch{batch}-", 10), 10, CONTAINER, TABLE, blob_service_client, index_config)
+
+    # The third segment exceeded max_segments, the three were merged into one sorted segment
+    assert len(index["segments"]) == 1
+    assert index["segments"][0]["num_keys"] == 30
+    assert (index["segments"][0]["key_min"], index["segments"][0]["key_max"]) == ("batch0-00000", "batch2-00009")
+
+    # The replaced segments and Bloom filters are deleted
+    stored = blob_service_client.list_names(CONTAINER, f"{TABLE}/_index/")
+    assert sorted(stored) == sorted([index["segments"][0]["path"], index["bloom_path"], f"{TABLE}/_index/index.json"])
+
+    df = pl.DataFrame({"_hashedId": ["batch1-00003", "new"]})
+    assert filter_new_keys(df, "_hashedId", index, CONTAINER, blob_service_client).get_column("_hashedId").to_list() == ["new"]
+
+
+def test_get_key_index_rebuilds_an_out_of_date_index(blob_service_client):
+    build_key_index(CONTAINER, TABLE, "_hashedId", empty_manifest(), blob_service_client, min_capacity=100)
+    manifest = {"version": 1, "parts": [{"path": f"{TABLE}/part-0.parquet", "num_rows": 3}]}
+    write_blob_to_container(pl.DataFrame({"_hashedId": ["a", "b", "c"]}), CONTAINER, f"{TABLE}/part-0.parquet", blob_service_client)
+
+    index = get_key_index(CONTAINER, TABLE, "_hashedId", manifest, blob_service_client, {"min_capacity": 100})
+
+    assert (index["num_keys"], index["num_rows"]) == (3, 3)
+    assert index["bloom"].might_contain(pl.Series(["a", "b", "c"])).all()
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import polars as pl
+import pytest
+
+# The silver asset module needs dagster to be imported
+pytest.importorskip("dagster")
+
+from assets.silver_assets.process_raw_epl_news import parse_published_dates
+
+
+# Extraction date of the page the published dates are relative to
+EXTRACTED_AT = datetime(2024, 10, 2, 12, 30)
+
+
+def parse(values):
+    df = pl.DataFrame({
+        "publishedDate": values,
+        "_extractedDate": [EXTRACTED_AT] * len(values)
+    })
+    return df.select(parse_published_dates().alias("parsed")).get_column("parsed").to_list()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1 min ago", "2024-10-02"),
+    ("45 mins ago", "2024-10-02"),
+    ("45 minutes ago", "2024-10-02"),
+    ("30 seconds ago", "2024-10-02"),
+    ("1 hour ago", "2024-10-02"),
+    ("13 hours ago", "2024-10-01"),
+    ("2 days ago", "2024-09-30"),
+    ("1 week ago", "2024-09-25"),
+    ("Yesterday", "2024-10-01"),
+    ("Today", "2024-10-02"),
+    ("just now", "2024-10-02"),
+])
+def test_relative_dates(value, expected):
+    assert parse([value]) == [expected]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("published at 14:02 2 October", "2024-10-02"),
+    ("2 October 2023", "2023-10-02"),
+    # Later in the year than the extraction date, published the year before
+    ("20 December", "2023-12-20"),
+    ("31 February", None),
+    ("No date found", None),
+])
+def test_absolute_dates(value, expected):
+    assert parse([value]) == [expected]
@@ -0,0 +1,130 @@
+import polars as pl
+import pytest
+
+# The table format reads and writes through the Azure SDK
+pytest.importorskip("azure.storage.blob")
+
+from utils.azure_blob_utils import write_blob_to_container
+from utils.table_format import (
+    load_manifest,
+    get_manifest_path,
+    upsert_table,
+    compact_table,
+    vacuum_table,
+    register_parts,
+    read_table
+)
+
+
+CONTAINER = "silver"
+TABLE = "epl_news/processed_data"
+PARTITION_BY = {"team": "teamName"}
+INDEX_CONFIG = {"false_positive_rate": 0.01, "min_capacity": 1000, "max_segments": 4, "segment_rows": 1000}
+
+
+def articles(ids, team="Arsenal", content="text"):
+    return pl.DataFrame({"id": ids, "teamName": [team] * len(ids), "content": [f"{content} {id_}" for id_ in ids]})
+
+
+def read_sorted(blob_service_client) -> pl.DataFrame:
+    return read_table(CONTAINER, TABLE, blob_service_client).sort("id")
+
+
+@pytest.mark.parametrize("index_config", [None, INDEX_CONFIG], ids=["manifest", "key_index"])
+def test_upsert_table_inserts_then_updates_changed_rows(blob_service_client, index_config):
+    _, num_inserted, num_updated = upsert_table(articles(["a", "b"]), CONTAINER, TABLE, "id", blob_service_client,
+                                                PARTITION_BY, index_config=index_config)
+    assert (num_inserted, num_updated) == (2, 0)
+
+    df = pl.concat([articles(["a"]), articles(["b"], content="edited"), articles(["c"], team="Chelsea")])
+    manifest, num_inserted, num_updated = upsert_table(df, CONTAINER, TABLE, "id", blob_service_client,
+                                                       PARTITION_BY, index_config=index_config)
+
+    assert (num_inserted, num_updated) == (1, 1)
+    assert manifest["version"] == 2
+    assert read_sorted(blob_service_client).equals(df.sort("id"))
+
+
+def test_upsert_table_does_not_commit_identical_rows(blob_service_client):
+    upsert_table(articles(["a", "b"]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+
+    manifest, num_inserted, num_updated = upsert_table(articles(["a", "b"]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+
+    assert (num_inserted, num_updated) == (0, 0)
+    assert manifest["version"] == 1
+
+
+def test_upsert_table_finds_keys_moved_to_another_partition(blob_service_client):
+    upsert_table(articles(["a"]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY, index_config=INDEX_CONFIG)
+
+    _, num_inserted, num_updated = upsert_table(articles(["a"], team="Chelsea"), CONTAINER, TABLE, "id", blob_service_client,
+                                                PARTITION_BY, index_config=INDEX_CONFIG)
+
+    assert (num_inserted, num_updated) == (0, 1)
+    assert read_sorted(blob_service_client).get_column("teamName").to_list() == ["Chelsea"]
+
+
+def test_compact_table_merges_small_parts(blob_service_client):
+    for id_ in ["d", "b", "a", "c"]:
+        upsert_table(articles([id_]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+    df_before = read_sorted(blob_service_client)
+
+    manifest = compact_table(CONTAINER, TABLE, "id", blob_service_client, target_rows=3, min_parts=4)
+
+    assert manifest["version"] == 5
+    assert [(part["key_min"], part["key_max"]) for part in manifest["parts"]] == [("a", "c"), ("d", "d")]
+    assert len(manifest["removed"]) == 4
+    assert read_sorted(blob_service_client).equals(df_before)
+
+
+def test_compact_table_skips_partitions_with_few_parts(blob_service_client):
+    for id_ in ["a", "b"]:
+        upsert_table(articles([id_]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+
+    assert compact_table(CONTAINER, TABLE, "id", blob_service_client, min_parts=4)["version"] == 2
+
+
+def test_vacuum_table_deletes_expired_files_without_a_new_version(blob_service_client):
+    for id_ in ["a", "b", "c", "d"]:
+        upsert_table(articles([id_]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+    removed_paths = [part["path"] for part in load_manifest(CONTAINER, TABLE, blob_service_client)["parts"]]
+    compact_table(CONTAINER, TABLE, "id", blob_service_client, min_parts=4)
+
+    num_deleted = vacuum_table(CONTAINER, TABLE, blob_service_client, retain_versions=1)
+
+    # The 4 compacted parts and the manifests of versions 1 to 4
+    assert num_deleted == 8
+    manifest = load_manifest(CONTAINER, TABLE, blob_service_client)
+    assert (manifest["version"], manifest["removed"], manifest["vacuumed_version"]) == (5, [], 4)
+    names = blob_service_client.list_names(CONTAINER)
+    assert not set(removed_paths) & set(names)
+    assert get_manifest_path(TABLE, 4) not in names and get_manifest_path(TABLE, 5) in names
+    assert read_sorted(blob_service_client).get_column("id").to_list() == ["a", "b", "c", "d"]
+
+    # Nothing left to delete, and the next version does not carry the deleted files
+    assert vacuum_table(CONTAINER, TABLE, blob_service_client, retain_versions=1) == 0
+    manifest, _, _ = upsert_table(articles(["e"]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+    assert (manifest["version"], manifest["removed"]) == (6, [])
+
+
+def test_vacuum_table_keeps_files_of_retained_versions(blob_service_client):
+    upsert_table(articles(["a"]), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+    upsert_table(articles(["a"], content="edited"), CONTAINER, TABLE, "id", blob_service_client, PARTITION_BY)
+
+    assert vacuum_table(CONTAINER, TABLE, blob_service_client, retain_versions=2) == 0
+    assert len(load_manifest(CONTAINER, TABLE, blob_service_client)["removed"]) == 1
+
+
+def test_register_parts_adopts_data_files_only(blob_service_client):
+    for path, ids in [(f"{TABLE}/team=Arsenal/part-0.parquet", ["a", "b"]), (f"{TABLE}/team=Chelsea/part-1.parquet", ["c"])]:
+        write_blob_to_container(articles(ids).drop("teamName"), CONTAINER, path, blob_service_client)
+    write_blob_to_container(pl.DataFrame({"key": ["a"]}), CONTAINER, f"{TABLE}/_index/keys-0.parquet", blob_service_client)
+
+    manifest = register_parts(CONTAINER, TABLE, blob_service_client.list_names(CONTAINER, TABLE), "id", blob_service_client)
+
+    assert [(part["partition"], part["num_rows"], part["key_min"], part["key_max"]) for part in manifest["parts"]] == [
+        ({"team": "Arsenal"}, 2, "a", "b"),
+        ({"team": "Chelsea"}, 1, "c", "c")
+    ]
+    # Registering again adds nothing
+    assert register_parts(CONTAINER, TABLE, blob_service_client.list_names(CONTAINER, TABLE), "id", blob_service_client)["version"] == 1